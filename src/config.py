@@ -3,16 +3,43 @@ import tomllib
 from dataclasses import dataclass
 from zoneinfo import ZoneInfo
 
-__all__ = ('Config', 'load_config',)
+from gspread.utils import ValueRenderOption
+
+from notification_rules import (
+    DEFAULT_NOTIFICATION_RULES, NotificationRulesTable,
+    compile_notification_rules, parse_notification_rules,
+)
+
+__all__ = ('Config', 'load_config', 'ROOT_PATH', 'resolve_root_path')
+
+ROOT_PATH = pathlib.Path(__file__).parent.parent
+
+
+def resolve_root_path(path: str | pathlib.Path) -> pathlib.Path:
+    """
+    Relative paths are resolved against the project root,
+    so they do not depend on the working directory.
+    """
+    return ROOT_PATH / path
 
 
 @dataclass(frozen=True, slots=True)
 class Config:
     google_sheets_credentials_file_path: pathlib.Path
     spreadsheet_key: str
+    google_sheets_value_render_option: ValueRenderOption
+    google_sheets_values_chunk_size: int | None
+    google_sheets_values_max_concurrency: int
     timezone: ZoneInfo
     units_storage_base_url: str
     message_queue_url: str
+    notification_rules: NotificationRulesTable
+    outbox_file_path: pathlib.Path
+    outbox_drain_interval_in_seconds: float
+    outbox_drain_timeout_in_seconds: float
+    snapshot_file_path: pathlib.Path
+    daemon_tick_interval_in_seconds: int
+    daemon_full_refresh_interval_in_seconds: int
 
 
 def load_config(file_path: pathlib.Path) -> Config:
@@ -23,14 +50,78 @@ def load_config(file_path: pathlib.Path) -> Config:
         pathlib.Path(config['google_sheets']['credentials_file_path'])
     )
     spreadsheet_key = config['google_sheets']['spreadsheet_key']
+    google_sheets_value_render_option = ValueRenderOption(
+        config['google_sheets'].get(
+            'value_render_option',
+            ValueRenderOption.formatted,
+        )
+    )
+    if google_sheets_value_render_option == ValueRenderOption.formula:
+        raise ValueError('Formula value render option is not supported')
+    google_sheets_values_chunk_size = (
+        config['google_sheets'].get('values_chunk_size')
+    )
+    google_sheets_values_max_concurrency = (
+        config['google_sheets'].get('values_max_concurrency', 4)
+    )
+    if (
+            google_sheets_values_chunk_size is not None
+            and google_sheets_values_chunk_size <= 0
+    ):
+        raise ValueError('Values chunk size must be positive')
+    if google_sheets_values_max_concurrency <= 0:
+        raise ValueError('Values max concurrency must be positive')
     timezone = ZoneInfo(config['timezone'])
     units_storage_base_url = config['units_storage']['base_url']
     message_queue_url = config['message_queue']['url']
+    notification_rules = compile_notification_rules(
+        parse_notification_rules(
+            config.get('notification_rules', DEFAULT_NOTIFICATION_RULES)
+        )
+    )
+    outbox_config = config.get('outbox', {})
+    outbox_file_path = resolve_root_path(
+        outbox_config.get('file_path', 'outbox.sqlite3')
+    )
+    outbox_drain_interval_in_seconds = (
+        outbox_config.get('drain_interval_in_seconds', 5)
+    )
+    outbox_drain_timeout_in_seconds = (
+        outbox_config.get('drain_timeout_in_seconds', 10)
+    )
+
+    snapshot_file_path = resolve_root_path(
+        config.get('snapshot', {}).get('file_path', 'schedule.snapshot')
+    )
+
+    daemon_config = config.get('daemon', {})
+    daemon_tick_interval_in_seconds = (
+        daemon_config.get('tick_interval_in_seconds', 60)
+    )
+    daemon_full_refresh_interval_in_seconds = (
+        daemon_config.get('full_refresh_interval_in_seconds', 1800)
+    )
+    if daemon_tick_interval_in_seconds <= 0:
+        raise ValueError('Daemon tick interval must be positive')
 
     return Config(
         google_sheets_credentials_file_path=google_sheets_credentials_file_path,
         spreadsheet_key=spreadsheet_key,
+        google_sheets_value_render_option=google_sheets_value_render_option,
+        google_sheets_values_chunk_size=google_sheets_values_chunk_size,
+        google_sheets_values_max_concurrency=(
+            google_sheets_values_max_concurrency
+        ),
         timezone=timezone,
         units_storage_base_url=units_storage_base_url,
         message_queue_url=message_queue_url,
+        notification_rules=notification_rules,
+        outbox_file_path=outbox_file_path,
+        outbox_drain_interval_in_seconds=outbox_drain_interval_in_seconds,
+        outbox_drain_timeout_in_seconds=outbox_drain_timeout_in_seconds,
+        snapshot_file_path=snapshot_file_path,
+        daemon_tick_interval_in_seconds=daemon_tick_interval_in_seconds,
+        daemon_full_refresh_interval_in_seconds=(
+            daemon_full_refresh_interval_in_seconds
+        ),
     )
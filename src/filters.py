@@ -3,7 +3,12 @@ from dataclasses import dataclass
 
 from enums import WriteOffType
 
-__all__ = ('BeforeExpiredFilter', 'AlreadyExpiredFilter', 'time_to_datetime')
+__all__ = (
+    'BeforeExpiredFilter',
+    'AlreadyExpiredFilter',
+    'time_to_datetime',
+    'compute_seconds_to_expiry',
+)
 
 
 def time_to_datetime(
@@ -17,6 +22,16 @@ def time_to_datetime(
     )
 
 
+def compute_seconds_to_expiry(
+        now: datetime.datetime,
+        expires_at: datetime.time,
+) -> int:
+    """Signed whole seconds left until expiry, negative if already expired."""
+    now = now.replace(microsecond=0)
+    expires_at = time_to_datetime(expires_at, now)
+    return int((expires_at - now).total_seconds())
+
+
 @dataclass(frozen=True, slots=True)
 class BeforeExpiredFilter:
     event_type: WriteOffType
@@ -33,6 +48,14 @@ class BeforeExpiredFilter:
         end = self.fire_before_in_seconds
         return start <= diff <= end
 
+    def compute_windows(self, horizon_in_seconds: int) -> list[range]:
+        """Ranges of seconds to expiry at which the filter is satisfied."""
+        start = max(self.fire_before_in_seconds - 60, -horizon_in_seconds)
+        end = min(self.fire_before_in_seconds, horizon_in_seconds)
+        if start > end:
+            return []
+        return [range(start, end + 1)]
+
 
 @dataclass(frozen=True, slots=True)
 class AlreadyExpiredFilter:
@@ -51,3 +74,13 @@ class AlreadyExpiredFilter:
             return False
 
         return 0 <= diff % self.interval_in_seconds <= 60
+
+    def compute_windows(self, horizon_in_seconds: int) -> list[range]:
+        """Ranges of seconds to expiry at which the filter is satisfied."""
+        windows: list[range] = []
+        end = 60
+        while end >= -horizon_in_seconds:
+            start = max(end - 60, -horizon_in_seconds)
+            windows.append(range(start, min(end, horizon_in_seconds) + 1))
+            end -= self.interval_in_seconds
+        return windows
@@ -1,14 +1,34 @@
+import codecs
 import datetime
+import json
+import logging
 import string
+import time
+from collections.abc import Generator, Sequence
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from functools import cache
-from typing import Iterable
+from typing import Iterable, TypeVar
 
 from gspread import Spreadsheet, Worksheet
-from gspread.utils import Dimension
+from gspread.exceptions import APIError
+from gspread.urls import SPREADSHEET_VALUES_BATCH_URL
+from gspread.utils import DateTimeOption, Dimension, ValueRenderOption
+from requests import RequestException
 
 from models import RGBColor
 
-__all__ = ('compute_ranges', 'SpreadsheetContext', 'compute_worksheet_ranges')
+__all__ = (
+    'compute_ranges',
+    'compute_checkbox_ranges',
+    'SpreadsheetContext',
+    'compute_worksheet_ranges',
+    'split_into_chunks',
+    'iter_value_ranges',
+)
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
 
 
 def compute_values_column_letters(
@@ -48,6 +68,91 @@ def compute_ranges(
     return ranges
 
 
+def split_into_chunks(
+        items: Sequence[T],
+        chunk_size: int,
+) -> list[Sequence[T]]:
+    return [
+        items[index:index + chunk_size]
+        for index in range(0, len(items), chunk_size)
+    ]
+
+
+def compute_checkbox_ranges(
+        *,
+        worksheet_titles: Iterable[str],
+        now: datetime.datetime
+) -> list[str]:
+    _, is_written_off_column = (
+        compute_values_column_letters(now.isoweekday())
+    )
+    return [
+        f'{title}!{is_written_off_column}2:{is_written_off_column}'
+        for title in worksheet_titles
+    ]
+
+
+def iter_value_ranges(
+        chunks: Iterable[bytes],
+) -> Generator[dict, None, None]:
+    """
+    Incrementally decode items of the "valueRanges" array
+    from the chunks of the values batch get response body.
+    """
+    decoder = json.JSONDecoder()
+    utf8_decoder = codecs.getincrementaldecoder('utf-8')()
+    chunks = iter(chunks)
+
+    buffer = ''
+    position = 0
+    is_array_started = False
+    is_stream_exhausted = False
+
+    while True:
+        if not is_array_started:
+            key_position = buffer.find('"valueRanges"')
+            array_position = buffer.find('[', key_position)
+            if key_position != -1 and array_position != -1:
+                is_array_started = True
+                position = array_position + 1
+                continue
+        else:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+
+            if position < len(buffer):
+                if buffer[position] == ']':
+                    return
+                try:
+                    value_range, position = decoder.raw_decode(
+                        buffer,
+                        position,
+                    )
+                except json.JSONDecodeError:
+                    if is_stream_exhausted:
+                        raise
+                else:
+                    # Drop already decoded part of the buffer
+                    buffer = buffer[position:]
+                    position = 0
+                    yield value_range
+                    continue
+
+        if is_stream_exhausted:
+            if is_array_started:
+                raise ValueError('Unterminated "valueRanges" array')
+            # Response without any value ranges
+            return
+
+        try:
+            chunk = next(chunks)
+        except StopIteration:
+            is_stream_exhausted = True
+            buffer += utf8_decoder.decode(b'', final=True)
+        else:
+            buffer += utf8_decoder.decode(chunk)
+
+
 class SpreadsheetContext:
 
     def __init__(
@@ -55,12 +160,25 @@ class SpreadsheetContext:
             *,
             spreadsheet: Spreadsheet,
             titles_whitelist: Iterable[str],
+            value_render_option: ValueRenderOption = (
+                    ValueRenderOption.formatted
+            ),
+            worksheets: Iterable[Worksheet] | None = None,
     ):
+        """
+        Args:
+            worksheets: Already fetched visible worksheets of the spreadsheet
+                to not request them again.
+        """
         self.__spreadsheet = spreadsheet
         self.__titles_whitelist = set(titles_whitelist)
+        self.__value_render_option = value_render_option
+        self.__worksheets = None if worksheets is None else list(worksheets)
 
     @cache
     def get_worksheets(self) -> list[Worksheet]:
+        if self.__worksheets is not None:
+            return self.__worksheets
         return self.__spreadsheet.worksheets(exclude_hidden=True)
 
     def get_titles(self) -> set[str]:
@@ -76,16 +194,155 @@ class SpreadsheetContext:
             if worksheet.title == title:
                 return worksheet
 
+    def get_values_params(self) -> dict:
+        params = {
+            'majorDimension': Dimension.cols,
+            'valueRenderOption': self.__value_render_option,
+        }
+        if self.__value_render_option == ValueRenderOption.unformatted:
+            # Times come as day fractions and checkboxes as booleans
+            params['dateTimeRenderOption'] = DateTimeOption.serial_number
+        return params
+
     def get_values(self, now: datetime.datetime) -> list[dict]:
-        worksheet_titles = self.get_titles()
+        return self.get_worksheets_values(self.get_titles(), now)
+
+    def get_worksheets_values(
+            self,
+            worksheet_titles: Iterable[str],
+            now: datetime.datetime,
+    ) -> list[dict]:
         ranges = compute_ranges(worksheet_titles=worksheet_titles, now=now)
+        values_response = self.__spreadsheet.values_batch_get(
+            ranges=ranges,
+            params=self.get_values_params(),
+        )
+        return values_response['valueRanges']
 
+    def get_checkbox_values(self, now: datetime.datetime) -> list[dict]:
+        """Only "is written off" column of every worksheet."""
+        ranges = compute_checkbox_ranges(
+            worksheet_titles=self.get_titles(),
+            now=now,
+        )
         values_response = self.__spreadsheet.values_batch_get(
             ranges=ranges,
-            params={'majorDimension': Dimension.cols}
+            params=self.get_values_params(),
         )
         return values_response['valueRanges']
 
+    def get_values_in_chunks(
+            self,
+            now: datetime.datetime,
+            *,
+            chunk_size: int,
+            max_concurrency: int,
+            max_attempts: int = 3,
+            retry_delay_in_seconds: float = 1,
+    ) -> tuple[list[dict], set[str]]:
+        """
+        Same as `get_values`, but worksheets are fetched concurrently
+        in chunks of `chunk_size` worksheets.
+
+        Failed chunks are split in half and retried,
+        chunks that are failed `max_attempts` times are skipped.
+
+        Returns:
+            Value ranges of the fetched worksheets and titles of the skipped.
+        """
+        worksheet_titles = sorted(self.get_titles())
+        title_to_value_ranges: dict[str, list[dict]] = {}
+        failed_titles: set[str] = set()
+
+        pending_chunks = [
+            (chunk, 1)
+            for chunk in split_into_chunks(worksheet_titles, chunk_size)
+        ]
+
+        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            while pending_chunks:
+                future_to_chunk = {
+                    executor.submit(
+                        self.get_worksheets_values,
+                        worksheet_titles=chunk,
+                        now=now,
+                    ): (chunk, attempt)
+                    for chunk, attempt in pending_chunks
+                }
+                pending_chunks = []
+
+                for future in as_completed(future_to_chunk):
+                    chunk, attempt = future_to_chunk[future]
+                    try:
+                        value_ranges = future.result()
+                    except (APIError, RequestException):
+                        if attempt >= max_attempts:
+                            logger.exception(
+                                f'Could not fetch worksheets: {chunk}'
+                            )
+                            failed_titles.update(chunk)
+                            continue
+                        logger.warning(
+                            f'Retrying to fetch worksheets: {chunk}'
+                        )
+                        pending_chunks += [
+                            (retry_chunk, attempt + 1)
+                            for retry_chunk in split_into_chunks(
+                                chunk,
+                                max(len(chunk) // 2, 1),
+                            )
+                        ]
+                        continue
+
+                    # Every worksheet has two ranges in the request order
+                    for index, title in enumerate(chunk):
+                        title_to_value_ranges[title] = (
+                            value_ranges[index * 2:index * 2 + 2]
+                        )
+
+                if pending_chunks:
+                    time.sleep(retry_delay_in_seconds)
+
+        value_ranges = [
+            value_range
+            for title in worksheet_titles
+            for value_range in title_to_value_ranges.get(title, [])
+        ]
+        return value_ranges, failed_titles
+
+    def iter_values(
+            self,
+            now: datetime.datetime,
+            chunk_size: int = 65536,
+    ) -> Generator[dict, None, None]:
+        """
+        Same as `get_values`, but value ranges are decoded from the response
+        body while it is being downloaded.
+        """
+        worksheet_titles = self.get_titles()
+        ranges = compute_ranges(worksheet_titles=worksheet_titles, now=now)
+
+        params = self.get_values_params()
+        params['ranges'] = ranges
+
+        # Spreadsheet client is the `HTTPClient` in gspread 6
+        http_client = self.__spreadsheet.client
+        url = SPREADSHEET_VALUES_BATCH_URL % self.__spreadsheet.id
+
+        with http_client.session.request(
+                method='get',
+                url=url,
+                params=params,
+                timeout=http_client.timeout,
+                stream=True,
+        ) as response:
+            if not response.ok:
+                raise APIError(response)
+
+            yield from iter_value_ranges(
+                response.iter_content(chunk_size=chunk_size),
+            )
+
 
 class WorksheetContext:
 
@@ -1,34 +1,39 @@
+import argparse
 import asyncio
+import contextlib
 import datetime
+import itertools
 import logging
 import pathlib
+from collections.abc import Iterable
 
 import gspread
-from gspread import Worksheet
+from faststream.rabbit import RabbitBroker
+from gspread import Client, Spreadsheet, Worksheet
 
-from colors import WRITE_OFF_TYPE_TO_COLOR
-from config import load_config
+from config import ROOT_PATH, Config, load_config, resolve_root_path
 from google_sheets import SpreadsheetContext, WorksheetContext
-from message_queue import publish_events
-from parsers import parse_worksheets_values, serialize_upcoming_write_offs
+from message_queue import (
+    connect_broker_or_none, drain_outbox,
+    run_outbox_drainer,
+)
+from models import NotificationEvent, Schedule, ScheduledWriteOff, Unit
+from outbox import Outbox
+from parsers import (
+    count_checkbox_rows, find_resized_worksheets, merge_checkbox_values,
+    parse_worksheets_values, serialize_upcoming_write_offs,
+)
+from profiling import NullProfiler, Profiler, TickProfiler
+from snapshot import load_schedule_snapshot, save_schedule_snapshot
 from units_storage import get_units
 
 logger = logging.getLogger(__name__)
 
 
-async def main() -> None:
-    config_file_path = pathlib.Path(__file__).parent.parent / 'config.toml'
-    config = load_config(config_file_path)
-
-    now = datetime.datetime.now(config.timezone)
-
-    units = get_units(base_url=config.units_storage_base_url)
-
-    client = gspread.service_account(config.google_sheets_credentials_file_path)
-    spreadsheet = client.open_by_key(config.spreadsheet_key)
-
-    worksheets: list[Worksheet] = spreadsheet.worksheets(exclude_hidden=True)
-
+def compute_titles_whitelist(
+        worksheets: Iterable[Worksheet],
+        units: Iterable[Unit],
+) -> set[str]:
     permitted_titles = {unit.name for unit in units}
     titles_whitelist = set()
     for worksheet in worksheets:
@@ -36,45 +41,725 @@ async def main() -> None:
             logger.warning(f'Skipping worksheet: {worksheet.title}')
         else:
             titles_whitelist.add(worksheet.title)
+    return titles_whitelist
 
-    if not titles_whitelist:
-        return
+
+def fetch_units(config: Config, profiler: Profiler) -> list[Unit]:
+    # Profiled in the worker thread, since cProfile of Python 3.11
+    # sees only the current thread
+    with profiler.stage('units_fetch'):
+        return get_units(base_url=config.units_storage_base_url)
+
+
+def open_spreadsheet(
+        config: Config,
+        client: Client,
+        profiler: Profiler,
+) -> tuple[Spreadsheet, list[Worksheet]]:
+    # Profiled in the worker thread, since cProfile of Python 3.11
+    # sees only the current thread
+    with profiler.stage('sheet_metadata'):
+        spreadsheet = client.open_by_key(config.spreadsheet_key)
+
+        worksheets: list[Worksheet] = spreadsheet.worksheets(
+            exclude_hidden=True,
+        )
+
+    return spreadsheet, worksheets
+
+
+async def load_units_and_spreadsheet_context(
+        config: Config,
+        client: Client,
+        profiler: Profiler,
+) -> tuple[list[Unit], SpreadsheetContext]:
+    """
+    Units and spreadsheet metadata do not depend on each other,
+    so they are fetched concurrently in worker threads.
+
+    If one of them fails, waiting for the other one is cancelled
+    and the error is raised right away. The worker thread itself
+    can not be interrupted: it finishes its request in background,
+    and the event loop waits for it at shutdown.
+
+    Profiler stages can not overlap, so profiled ticks fetch them
+    one after the other.
+    """
+    if profiler.is_enabled:
+        units = await asyncio.to_thread(fetch_units, config, profiler)
+        spreadsheet, worksheets = await asyncio.to_thread(
+            open_spreadsheet,
+            config,
+            client,
+            profiler,
+        )
+    else:
+        async with asyncio.TaskGroup() as task_group:
+            units_task = task_group.create_task(
+                asyncio.to_thread(fetch_units, config, profiler)
+            )
+            spreadsheet_task = task_group.create_task(
+                asyncio.to_thread(open_spreadsheet, config, client, profiler)
+            )
+        units = units_task.result()
+        spreadsheet, worksheets = spreadsheet_task.result()
 
     spreadsheet_context = SpreadsheetContext(
         spreadsheet=spreadsheet,
-        titles_whitelist=titles_whitelist,
+        titles_whitelist=compute_titles_whitelist(worksheets, units),
+        value_render_option=config.google_sheets_value_render_option,
+        worksheets=worksheets,
     )
-    value_ranges = spreadsheet_context.get_values(now)
+    return units, spreadsheet_context
+
+
+def read_write_offs(
+        config: Config,
+        spreadsheet_context: SpreadsheetContext,
+        now: datetime.datetime,
+        profiler: Profiler,
+        title_to_checkbox_rows_count: dict[str, int] | None = None,
+) -> tuple[Iterable[ScheduledWriteOff], set[str]]:
+    """
+    Args:
+        title_to_checkbox_rows_count: Filled with rows of the checkbox
+            columns once the write-offs are consumed, if set.
+
+    Returns:
+        Write-offs and titles of the worksheets that could not be fetched.
+    """
+    failed_titles: set[str] = set()
+
+    with profiler.stage('sheet_read'):
+        if config.google_sheets_values_chunk_size is None:
+            value_ranges = spreadsheet_context.iter_values(now)
+        else:
+            value_ranges, failed_titles = (
+                spreadsheet_context.get_values_in_chunks(
+                    now,
+                    chunk_size=config.google_sheets_values_chunk_size,
+                    max_concurrency=(
+                        config.google_sheets_values_max_concurrency
+                    ),
+                )
+            )
+        if title_to_checkbox_rows_count is not None:
+            value_ranges = count_checkbox_rows(
+                value_ranges=value_ranges,
+                title_to_rows_count=title_to_checkbox_rows_count,
+            )
+        if profiler.is_enabled:
+            # Values are streamed into the parser otherwise,
+            # so read and parse could not be measured separately
+            value_ranges = list(value_ranges)
+
+    with profiler.stage('parse'):
+        write_offs = parse_worksheets_values(
+            value_ranges=value_ranges,
+            timezone=config.timezone,
+            value_render_option=config.google_sheets_value_render_option,
+        )
+        if profiler.is_enabled:
+            write_offs = list(write_offs)
+
+    return write_offs, failed_titles
+
+
+def publish(
+        config: Config,
+        outbox: Outbox,
+        units: Iterable[Unit],
+        write_offs: Iterable[ScheduledWriteOff],
+        now: datetime.datetime,
+        profiler: Profiler,
+) -> list[NotificationEvent]:
+    with profiler.stage('serialize'):
+        events = serialize_upcoming_write_offs(
+            write_offs=write_offs,
+            now=now,
+            unit_name_to_id={unit.name: unit.id for unit in units},
+            notification_rules=config.notification_rules,
+        )
+
+    if not events:
+        logger.info('No events')
+        return events
 
-    write_offs = parse_worksheets_values(value_ranges, config.timezone)
+    # Events are published by the outbox drainer,
+    # so the tick does not depend on the message queue availability
+    with profiler.stage('publish'):
+        outbox.put_events(events)
 
-    events = serialize_upcoming_write_offs(
+    return events
+
+
+def recolor(
+        config: Config,
+        spreadsheet_context: SpreadsheetContext,
+        events: Iterable[NotificationEvent],
+        profiler: Profiler,
+) -> None:
+    with profiler.stage('recolor'):
+        for event in events:
+            worksheet = spreadsheet_context.get_worksheet_by_title(
+                title=event.payload.unit_name,
+            )
+            background_color = config.notification_rules.get_color(
+                event_type=event.payload.type,
+            )
+            worksheet_context = WorksheetContext(worksheet)
+
+            worksheet_context.update_cell_color(
+                cell_coordinates=event.payload.write_off_time_a1_coordinates,
+                background_color=background_color,
+            )
+
+
+def notify(
+        config: Config,
+        outbox: Outbox,
+        spreadsheet_context: SpreadsheetContext,
+        units: Iterable[Unit],
+        write_offs: Iterable[ScheduledWriteOff],
+        now: datetime.datetime,
+        profiler: Profiler,
+) -> None:
+    events = publish(
+        config=config,
+        outbox=outbox,
+        units=units,
         write_offs=write_offs,
         now=now,
-        unit_name_to_id={unit.name: unit.id for unit in units},
+        profiler=profiler,
+    )
+    recolor(
+        config=config,
+        spreadsheet_context=spreadsheet_context,
+        events=events,
+        profiler=profiler,
     )
 
-    if not events:
-        logger.info('No events')
+
+def is_full_refresh_required(
+        config: Config,
+        schedule: Schedule,
+        now: datetime.datetime,
+) -> bool:
+    # Write-off time columns depend on the weekday
+    if schedule.refreshed_at.date() != now.date():
+        return True
+    seconds_since_refresh = (now - schedule.refreshed_at).total_seconds()
+    return (
+            seconds_since_refresh
+            >= config.daemon_full_refresh_interval_in_seconds
+    )
+
+
+async def refresh_schedule(
+        config: Config,
+        client: Client,
+        now: datetime.datetime,
+        profiler: Profiler,
+) -> tuple[SpreadsheetContext, Schedule, set[str]]:
+    """
+    Full read of units, worksheets, ingredient names and times.
+
+    Returns:
+        Spreadsheet context, schedule and titles of the worksheets
+        that could not be fetched, so the schedule misses them.
+    """
+    units, spreadsheet_context = await load_units_and_spreadsheet_context(
+        config=config,
+        client=client,
+        profiler=profiler,
+    )
+    worksheet_titles = spreadsheet_context.get_titles()
+    title_to_checkbox_rows_count: dict[str, int] = {}
+
+    if worksheet_titles:
+        write_offs, failed_titles = read_write_offs(
+            config=config,
+            spreadsheet_context=spreadsheet_context,
+            now=now,
+            profiler=profiler,
+            title_to_checkbox_rows_count=title_to_checkbox_rows_count,
+        )
+        write_offs = list(write_offs)
+    else:
+        write_offs, failed_titles = [], set()
+
+    schedule = Schedule(
+        units=units,
+        worksheet_titles=worksheet_titles,
+        write_offs=write_offs,
+        refreshed_at=now,
+        title_to_checkbox_rows_count=title_to_checkbox_rows_count,
+    )
+    return spreadsheet_context, schedule, failed_titles
+
+
+def refresh_checkboxes(
+        config: Config,
+        spreadsheet_context: SpreadsheetContext,
+        schedule: Schedule,
+        now: datetime.datetime,
+        profiler: Profiler,
+) -> Schedule | None:
+    """
+    Cheap read of "is written off" columns only.
+
+    Returns:
+        None if rows are inserted or deleted since the full read,
+        so checkboxes can not be matched to the cached write-offs.
+    """
+    if not schedule.worksheet_titles:
+        return schedule
+
+    with profiler.stage('checkbox_read'):
+        value_ranges = spreadsheet_context.get_checkbox_values(now)
+
+    with profiler.stage('checkbox_merge'):
+        resized_titles = find_resized_worksheets(
+            value_ranges=value_ranges,
+            title_to_rows_count=schedule.title_to_checkbox_rows_count,
+        )
+        if resized_titles:
+            logger.info(
+                f'Rows of worksheets are changed: {sorted(resized_titles)}'
+            )
+            return
+
+        write_offs = merge_checkbox_values(
+            write_offs=schedule.write_offs,
+            value_ranges=value_ranges,
+            value_render_option=config.google_sheets_value_render_option,
+        )
+    return Schedule(
+        units=schedule.units,
+        worksheet_titles=schedule.worksheet_titles,
+        write_offs=write_offs,
+        refreshed_at=schedule.refreshed_at,
+        title_to_checkbox_rows_count=schedule.title_to_checkbox_rows_count,
+    )
+
+
+def load_snapshot_or_none(
+        config: Config,
+        now: datetime.datetime,
+) -> Schedule | None:
+    try:
+        schedule = load_schedule_snapshot(
+            file_path=config.snapshot_file_path,
+            timezone=config.timezone,
+        )
+    except FileNotFoundError:
+        return
+    except ValueError:
+        logger.warning('Skipping invalid schedule snapshot', exc_info=True)
         return
 
-    await publish_events(
-        message_queue_url=config.message_queue_url,
-        events=events
+    # Write-off time columns depend on the weekday
+    if schedule.refreshed_at.date() != now.date():
+        logger.info('Skipping outdated schedule snapshot')
+        return
+
+    return schedule
+
+
+def save_snapshot(
+        config: Config,
+        schedule: Schedule,
+        profiler: Profiler,
+) -> bool:
+    """
+    Snapshot is only an optimization of the restart,
+    so it never fails the tick.
+
+    Returns:
+        Whether the snapshot is saved.
+    """
+    with profiler.stage('snapshot'):
+        try:
+            save_schedule_snapshot(
+                schedule=schedule,
+                file_path=config.snapshot_file_path,
+                timezone=config.timezone,
+            )
+        except Exception:
+            logger.exception('Could not save schedule snapshot')
+            return False
+    return True
+
+
+async def warm_start(
+        config: Config,
+        client: Client,
+        outbox: Outbox,
+        schedule: Schedule,
+        now: datetime.datetime,
+        profiler: Profiler,
+) -> tuple[SpreadsheetContext | None, Schedule]:
+    """
+    Notify from the snapshot right away, before the live spreadsheet is read.
+
+    Events are drained before the live read starts, since the read
+    blocks the event loop and the outbox drainer could not publish them.
+    Cells are recolored once the live spreadsheet is available.
+
+    Snapshot schedule is kept without the spreadsheet context
+    if some worksheets could not be fetched, so the full read is retried.
+    """
+    events = publish(
+        config=config,
+        outbox=outbox,
+        units=schedule.units,
+        write_offs=schedule.write_offs,
+        now=now,
+        profiler=profiler,
+    )
+    with profiler.stage('drain'):
+        await drain_outbox_with_timeout(config=config, outbox=outbox)
+
+    spreadsheet_context, live_schedule, failed_titles = await refresh_schedule(
+        config=config,
+        client=client,
+        now=now,
+        profiler=profiler,
+    )
+    recolor(
+        config=config,
+        spreadsheet_context=spreadsheet_context,
+        events=events,
+        profiler=profiler,
+    )
+    if failed_titles:
+        return None, schedule
+    return spreadsheet_context, live_schedule
+
+
+async def refresh_and_notify(
+        config: Config,
+        client: Client,
+        outbox: Outbox,
+        spreadsheet_context: SpreadsheetContext | None,
+        schedule: Schedule | None,
+        now: datetime.datetime,
+        profiler: Profiler,
+) -> tuple[SpreadsheetContext | None, Schedule | None]:
+    """
+    Partial schedule of the full read with some worksheets not fetched
+    is notified, but the previous one is kept, so the full read is retried
+    on the next tick instead of missing the worksheets until the next
+    full refresh.
+    """
+    fresh_spreadsheet_context = spreadsheet_context
+    fresh_schedule: Schedule | None = None
+    failed_titles: set[str] = set()
+
+    if spreadsheet_context is not None and not is_full_refresh_required(
+            config=config,
+            schedule=schedule,
+            now=now,
+    ):
+        fresh_schedule = refresh_checkboxes(
+            config=config,
+            spreadsheet_context=spreadsheet_context,
+            schedule=schedule,
+            now=now,
+            profiler=profiler,
+        )
+
+    if fresh_schedule is None:
+        fresh_spreadsheet_context, fresh_schedule, failed_titles = (
+            await refresh_schedule(
+                config=config,
+                client=client,
+                now=now,
+                profiler=profiler,
+            )
+        )
+
+    notify(
+        config=config,
+        outbox=outbox,
+        spreadsheet_context=fresh_spreadsheet_context,
+        units=fresh_schedule.units,
+        write_offs=fresh_schedule.write_offs,
+        now=now,
+        profiler=profiler,
+    )
+
+    if failed_titles:
+        logger.warning(
+            f'Keeping previous schedule,'
+            f' worksheets are not fetched: {sorted(failed_titles)}'
+        )
+        return spreadsheet_context, schedule
+    return fresh_spreadsheet_context, fresh_schedule
+
+
+def create_profiler(
+        profile_directory: pathlib.Path | None,
+        tick_number: int,
+        profile_every: int,
+) -> Profiler:
+    if profile_directory is None or tick_number % profile_every != 0:
+        return NullProfiler()
+    return TickProfiler(output_directory=profile_directory)
+
+
+async def run_daemon(
+        config: Config,
+        outbox: Outbox,
+        profile_directory: pathlib.Path | None = None,
+        profile_every: int = 1,
+) -> None:
+    drainer_task = asyncio.create_task(
+        run_outbox_drainer(
+            message_queue_url=config.message_queue_url,
+            outbox=outbox,
+            interval_in_seconds=config.outbox_drain_interval_in_seconds,
+        )
+    )
+    try:
+        await run_ticks(
+            config=config,
+            outbox=outbox,
+            profile_directory=profile_directory,
+            profile_every=profile_every,
+        )
+    finally:
+        drainer_task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await drainer_task
+
+
+async def run_ticks(
+        config: Config,
+        outbox: Outbox,
+        profile_directory: pathlib.Path | None,
+        profile_every: int,
+) -> None:
+    client = gspread.service_account(config.google_sheets_credentials_file_path)
+
+    spreadsheet_context: SpreadsheetContext | None = None
+    schedule = load_snapshot_or_none(
+        config=config,
+        now=datetime.datetime.now(config.timezone),
     )
+    saved_schedule = schedule
+    is_warm_start = schedule is not None
 
-    for event in events:
-        worksheet = spreadsheet_context.get_worksheet_by_title(
-            title=event.payload.unit_name,
+    for tick_number in itertools.count():
+        now = datetime.datetime.now(config.timezone)
+        profiler = create_profiler(
+            profile_directory=profile_directory,
+            tick_number=tick_number,
+            profile_every=profile_every,
         )
-        background_color = WRITE_OFF_TYPE_TO_COLOR[event.payload.type]
-        worksheet_context = WorksheetContext(worksheet)
 
-        worksheet_context.update_cell_color(
-            cell_coordinates=event.payload.write_off_time_a1_coordinates,
-            background_color=background_color,
+        try:
+            if is_warm_start:
+                is_warm_start = False
+                spreadsheet_context, schedule = await warm_start(
+                    config=config,
+                    client=client,
+                    outbox=outbox,
+                    schedule=schedule,
+                    now=now,
+                    profiler=profiler,
+                )
+            else:
+                spreadsheet_context, schedule = await refresh_and_notify(
+                    config=config,
+                    client=client,
+                    outbox=outbox,
+                    spreadsheet_context=spreadsheet_context,
+                    schedule=schedule,
+                    now=now,
+                    profiler=profiler,
+                )
+
+            # Most ticks do not change any checkbox
+            is_schedule_changed = (
+                    schedule is not None
+                    and schedule != saved_schedule
+            )
+            if is_schedule_changed and save_snapshot(
+                    config=config,
+                    schedule=schedule,
+                    profiler=profiler,
+            ):
+                saved_schedule = schedule
+        except Exception:
+            logger.exception('Tick failed')
+        finally:
+            profiler.finish()
+
+        elapsed = datetime.datetime.now(config.timezone) - now
+        await asyncio.sleep(
+            max(
+                config.daemon_tick_interval_in_seconds
+                - elapsed.total_seconds(),
+                0,
+            )
         )
 
 
+async def main(
+        daemon: bool = False,
+        profile_directory: pathlib.Path | None = None,
+        profile_every: int = 1,
+) -> None:
+    config_file_path = ROOT_PATH / 'config.toml'
+    config = load_config(config_file_path)
+
+    outbox = Outbox(config.outbox_file_path)
+    try:
+        if daemon:
+            await run_daemon(
+                config=config,
+                outbox=outbox,
+                profile_directory=profile_directory,
+                profile_every=profile_every,
+            )
+            return
+
+        profiler = create_profiler(
+            profile_directory=profile_directory,
+            tick_number=0,
+            profile_every=profile_every,
+        )
+        try:
+            await run_tick(config, outbox, profiler)
+        finally:
+            profiler.finish()
+    finally:
+        outbox.close()
+
+
+async def drain_outbox_with_timeout(
+        config: Config,
+        outbox: Outbox,
+        broker_task: asyncio.Task[RabbitBroker | None] | None = None,
+) -> None:
+    """
+    Undelivered events are kept in the outbox until the next run.
+
+    Waiting for the broker connection counts towards the timeout too,
+    new connection is opened if `broker_task` is not set.
+    """
+    try:
+        async with asyncio.timeout(config.outbox_drain_timeout_in_seconds):
+            broker = None if broker_task is None else await broker_task
+            await drain_outbox(
+                message_queue_url=config.message_queue_url,
+                outbox=outbox,
+                broker=broker,
+            )
+    except Exception:
+        logger.exception(
+            f'Could not drain outbox,'
+            f' {outbox.count_pending_events()} events are pending'
+        )
+
+
+async def run_tick(
+        config: Config,
+        outbox: Outbox,
+        profiler: Profiler,
+) -> None:
+    now = datetime.datetime.now(config.timezone)
+
+    client = gspread.service_account(config.google_sheets_credentials_file_path)
+
+    async with contextlib.AsyncExitStack() as exit_stack:
+        # Broker connection is opened while the spreadsheet is read,
+        # but the tick waits for it only when the outbox is drained,
+        # so a slow message queue does not delay notifications
+        broker_task = asyncio.create_task(
+            connect_broker_or_none(
+                message_queue_url=config.message_queue_url,
+                exit_stack=exit_stack,
+            )
+        )
+        try:
+            units, spreadsheet_context = (
+                await load_units_and_spreadsheet_context(
+                    config=config,
+                    client=client,
+                    profiler=profiler,
+                )
+            )
+
+            if spreadsheet_context.get_titles():
+                write_offs, _ = read_write_offs(
+                    config=config,
+                    spreadsheet_context=spreadsheet_context,
+                    now=now,
+                    profiler=profiler,
+                )
+                notify(
+                    config=config,
+                    outbox=outbox,
+                    spreadsheet_context=spreadsheet_context,
+                    units=units,
+                    write_offs=write_offs,
+                    now=now,
+                    profiler=profiler,
+                )
+
+            with profiler.stage('drain'):
+                await drain_outbox_with_timeout(
+                    config=config,
+                    outbox=outbox,
+                    broker_task=broker_task,
+                )
+        finally:
+            # Connection must not be opened after the exit stack is closed
+            broker_task.cancel()
+            await asyncio.wait([broker_task])
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--daemon',
+        action='store_true',
+        help='Run ticks periodically instead of a single tick',
+    )
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='Record CPU profile and allocations of every tick stage',
+    )
+    parser.add_argument(
+        '--profile-directory',
+        type=pathlib.Path,
+        default=pathlib.Path('profiles'),
+        help='Directory for the profiles, relative to the project root',
+    )
+    parser.add_argument(
+        '--profile-every',
+        type=int,
+        default=1,
+        help='Profile only one tick out of N in daemon mode',
+    )
+    args = parser.parse_args()
+    if args.profile_every <= 0:
+        parser.error('--profile-every must be positive')
+    return args
+
+
 if __name__ == '__main__':
-    asyncio.run(main())
+    args = parse_args()
+    asyncio.run(
+        main(
+            daemon=args.daemon,
+            profile_directory=(
+                resolve_root_path(args.profile_directory)
+                if args.profile else None
+            ),
+            profile_every=args.profile_every,
+        )
+    )
@@ -1,19 +1,117 @@
-from collections.abc import Iterable
+import asyncio
+import contextlib
+import logging
 
 from faststream.rabbit import RabbitBroker
 
 from models import NotificationEvent
+from outbox import Outbox
 
-__all__ = ('publish_events',)
+__all__ = (
+    'drain_outbox',
+    'run_outbox_drainer',
+    'connect_broker_or_none',
+)
 
+logger = logging.getLogger(__name__)
 
-async def publish_events(
+
+async def publish_event(
+        broker: RabbitBroker,
+        event: NotificationEvent,
+) -> None:
+    await broker.publish(
+        message=event.model_dump(),
+        queue='specific-units-event',
+    )
+
+
+async def connect_broker_or_none(
+        message_queue_url: str,
+        exit_stack: contextlib.AsyncExitStack,
+) -> RabbitBroker | None:
+    """
+    Connected broker that is closed together with the `exit_stack`.
+
+    Broker is not required for the tick, since events wait in the outbox,
+    so connection errors are only logged.
+    """
+    try:
+        return await exit_stack.enter_async_context(
+            RabbitBroker(message_queue_url),
+        )
+    except Exception:
+        logger.exception('Could not connect to the message queue')
+
+
+async def drain_outbox(
+        message_queue_url: str,
+        outbox: Outbox,
+        batch_size: int = 100,
+        broker: RabbitBroker | None = None,
+) -> int:
+    """
+    Publish all pending events of the outbox.
+
+    Every event is acknowledged right after it is published,
+    so the events may be delivered more than once, but never lost.
+
+    Args:
+        broker: Already connected broker, new connection is opened if not set.
+
+    Returns:
+        Number of delivered events.
+    """
+    delivered_events_count = 0
+
+    pending_events = outbox.get_pending_events(batch_size)
+    if not pending_events:
+        return delivered_events_count
+
+    async with contextlib.AsyncExitStack() as exit_stack:
+        if broker is None:
+            broker = await exit_stack.enter_async_context(
+                RabbitBroker(message_queue_url),
+            )
+
+        while pending_events:
+            for event_id, event in pending_events:
+                await publish_event(broker, event)
+                outbox.acknowledge(event_id)
+                delivered_events_count += 1
+            pending_events = outbox.get_pending_events(batch_size)
+
+    return delivered_events_count
+
+
+async def run_outbox_drainer(
         message_queue_url: str,
-        events: Iterable[NotificationEvent],
+        outbox: Outbox,
+        interval_in_seconds: float,
+        max_retry_delay_in_seconds: float = 60,
 ) -> None:
-    async with RabbitBroker(message_queue_url) as broker:
-        for event in events:
-            await broker.publish(
-                message=event.model_dump(),
-                queue='specific-units-event',
+    retry_delay_in_seconds = interval_in_seconds
+
+    while True:
+        try:
+            delivered_events_count = await drain_outbox(
+                message_queue_url=message_queue_url,
+                outbox=outbox,
+            )
+        except Exception:
+            logger.exception(
+                f'Could not drain outbox,'
+                f' retrying in {retry_delay_in_seconds} seconds'
             )
+            await asyncio.sleep(retry_delay_in_seconds)
+            retry_delay_in_seconds = min(
+                retry_delay_in_seconds * 2,
+                max_retry_delay_in_seconds,
+            )
+            continue
+
+        if delivered_events_count:
+            logger.info(f'Delivered {delivered_events_count} events')
+
+        retry_delay_in_seconds = interval_in_seconds
+        await asyncio.sleep(interval_in_seconds)
@@ -16,6 +16,7 @@ __all__ = (
     'RGBColor',
     'WriteOffWorksheetCoordinates',
     'ScheduledWriteOff',
+    'Schedule',
 )
 
 
@@ -67,6 +68,17 @@ class NotificationEvent(BaseModel):
     type: str = Field(default='WRITE_OFFS', frozen=True)
 
 
+@dataclass(frozen=True, slots=True)
+class Schedule:
+    """Parsed state of the spreadsheet cached between ticks."""
+    units: list[Unit]
+    worksheet_titles: set[str]
+    write_offs: list[ScheduledWriteOff]
+    refreshed_at: datetime.datetime
+    # Rows of "is written off" columns on the full read
+    title_to_checkbox_rows_count: dict[str, int]
+
+
 class RGBColor(BaseModel):
     red: Annotated[float, Field(ge=0, le=1)]
     green: Annotated[float, Field(ge=0, le=1)]
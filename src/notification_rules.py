@@ -0,0 +1,175 @@
+import datetime
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass
+
+from enums import WriteOffType
+from filters import (
+    AlreadyExpiredFilter, BeforeExpiredFilter,
+    compute_seconds_to_expiry,
+)
+from models import RGBColor
+
+__all__ = (
+    'NotificationRule',
+    'NotificationRulesTable',
+    'compile_notification_rules',
+    'parse_notification_rules',
+    'DEFAULT_NOTIFICATION_RULES',
+)
+
+# Used when config has no rules, same as before rules became configurable
+DEFAULT_NOTIFICATION_RULES = (
+    {
+        'event_type': WriteOffType.EXPIRE_AT_15_MINUTES,
+        'fire_before_in_seconds': 900,
+        'color': {
+            'red': 1.0,
+            'green': 0.8274509804,
+            'blue': 0.2901960784,
+        },
+    },
+    {
+        'event_type': WriteOffType.EXPIRE_AT_10_MINUTES,
+        'fire_before_in_seconds': 600,
+        'color': {
+            'red': 0.9529411765,
+            'green': 0.5254901961,
+            'blue': 0.01176470588,
+        },
+    },
+    {
+        'event_type': WriteOffType.EXPIRE_AT_5_MINUTES,
+        'fire_before_in_seconds': 300,
+        'color': {
+            'red': 0.9529411765,
+            'green': 0.2862745098,
+            'blue': 0.01176470588,
+        },
+    },
+    {
+        'event_type': WriteOffType.ALREADY_EXPIRED,
+        'interval_in_seconds': 600,
+        'color': {
+            'red': 1.0,
+            'green': 0.2,
+            'blue': 0.0,
+        },
+    },
+)
+
+# Write-off time is combined with the current date,
+# so seconds to expiry never leave the (-1 day, +1 day) interval.
+HORIZON_IN_SECONDS = 86400
+
+
+@dataclass(frozen=True, slots=True)
+class NotificationRule:
+    filter: BeforeExpiredFilter | AlreadyExpiredFilter
+    color: RGBColor
+
+    @property
+    def event_type(self) -> WriteOffType:
+        return WriteOffType(self.filter.event_type)
+
+
+@dataclass(frozen=True, slots=True)
+class NotificationRulesTable:
+    """
+    Event types precomputed for every signed second to expiry.
+
+    Index of the event type is seconds to expiry shifted by the horizon.
+    """
+    event_types: tuple[WriteOffType | None, ...]
+    event_type_to_color: Mapping[WriteOffType, RGBColor]
+
+    def get_event_type(
+            self,
+            now: datetime.datetime,
+            expires_at: datetime.time,
+    ) -> WriteOffType | None:
+        seconds_to_expiry = compute_seconds_to_expiry(now, expires_at)
+        index = seconds_to_expiry + HORIZON_IN_SECONDS
+        if not 0 <= index < len(self.event_types):
+            return
+        return self.event_types[index]
+
+    def get_color(self, event_type: WriteOffType) -> RGBColor:
+        return self.event_type_to_color[event_type]
+
+
+def parse_notification_rule(rule: Mapping) -> NotificationRule:
+    event_type = WriteOffType(rule['event_type'])
+    color = RGBColor.model_validate(rule['color'])
+
+    has_fire_before = 'fire_before_in_seconds' in rule
+    has_interval = 'interval_in_seconds' in rule
+
+    if has_fire_before == has_interval:
+        raise ValueError(
+            f'Notification rule {event_type} must have exactly one of'
+            ' "fire_before_in_seconds" or "interval_in_seconds"'
+        )
+
+    if has_fire_before:
+        fire_before_in_seconds = int(rule['fire_before_in_seconds'])
+        if fire_before_in_seconds <= 0:
+            raise ValueError(
+                f'Notification rule {event_type}:'
+                ' "fire_before_in_seconds" must be positive'
+            )
+        write_offs_filter = BeforeExpiredFilter(
+            event_type=event_type,
+            fire_before_in_seconds=fire_before_in_seconds,
+        )
+    else:
+        interval_in_seconds = int(rule['interval_in_seconds'])
+        if interval_in_seconds <= 60:
+            raise ValueError(
+                f'Notification rule {event_type}:'
+                ' "interval_in_seconds" must be greater than 60'
+            )
+        write_offs_filter = AlreadyExpiredFilter(
+            event_type=event_type,
+            interval_in_seconds=interval_in_seconds,
+        )
+
+    return NotificationRule(filter=write_offs_filter, color=color)
+
+
+def parse_notification_rules(
+        rules: Iterable[Mapping],
+) -> list[NotificationRule]:
+    return [parse_notification_rule(rule) for rule in rules]
+
+
+def compile_notification_rules(
+        rules: Iterable[NotificationRule],
+) -> NotificationRulesTable:
+    event_types: list[WriteOffType | None] = [None] * (
+            HORIZON_IN_SECONDS * 2 + 1
+    )
+    event_type_to_color: dict[WriteOffType, RGBColor] = {}
+
+    for rule in rules:
+        if rule.event_type in event_type_to_color:
+            raise ValueError(
+                f'Notification rule {rule.event_type} is defined twice'
+            )
+        event_type_to_color[rule.event_type] = rule.color
+
+        for window in rule.filter.compute_windows(HORIZON_IN_SECONDS):
+            for seconds_to_expiry in window:
+                index = seconds_to_expiry + HORIZON_IN_SECONDS
+                overlapped_event_type = event_types[index]
+                if overlapped_event_type is not None:
+                    raise ValueError(
+                        f'Notification rule {rule.event_type} overlaps'
+                        f' {overlapped_event_type}'
+                        f' at {seconds_to_expiry} seconds to expiry'
+                    )
+                event_types[index] = rule.event_type
+
+    return NotificationRulesTable(
+        event_types=tuple(event_types),
+        event_type_to_color=event_type_to_color,
+    )
@@ -0,0 +1,61 @@
+import pathlib
+import sqlite3
+from collections.abc import Iterable
+
+from models import NotificationEvent
+
+__all__ = ('Outbox',)
+
+
+class Outbox:
+    """
+    Disk-backed queue of events that are not delivered to the message queue
+    yet. Events survive restarts until they are acknowledged.
+    """
+
+    def __init__(self, file_path: pathlib.Path):
+        self.__connection = sqlite3.connect(file_path)
+        with self.__connection:
+            self.__connection.execute(
+                'CREATE TABLE IF NOT EXISTS outbox_events ('
+                ' id INTEGER PRIMARY KEY AUTOINCREMENT,'
+                ' event TEXT NOT NULL'
+                ')'
+            )
+
+    def close(self) -> None:
+        self.__connection.close()
+
+    def put_events(self, events: Iterable[NotificationEvent]) -> None:
+        with self.__connection:
+            self.__connection.executemany(
+                'INSERT INTO outbox_events (event) VALUES (?)',
+                ((event.model_dump_json(),) for event in events),
+            )
+
+    def get_pending_events(
+            self,
+            limit: int,
+    ) -> list[tuple[int, NotificationEvent]]:
+        """Oldest events first with their outbox IDs."""
+        rows = self.__connection.execute(
+            'SELECT id, event FROM outbox_events ORDER BY id LIMIT ?',
+            (limit,),
+        ).fetchall()
+        return [
+            (event_id, NotificationEvent.model_validate_json(event))
+            for event_id, event in rows
+        ]
+
+    def acknowledge(self, event_id: int) -> None:
+        with self.__connection:
+            self.__connection.execute(
+                'DELETE FROM outbox_events WHERE id = ?',
+                (event_id,),
+            )
+
+    def count_pending_events(self) -> int:
+        row = self.__connection.execute(
+            'SELECT COUNT(*) FROM outbox_events',
+        ).fetchone()
+        return row[0]
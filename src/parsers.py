@@ -1,28 +1,34 @@
 import collections
 import datetime
-import itertools
 import logging
-from collections.abc import Generator, Iterable, Mapping, Sized
+from collections.abc import Callable, Generator, Iterable, Mapping, Sized
 from dataclasses import dataclass
 from typing import Protocol, TypeVar
 from zoneinfo import ZoneInfo
 
-from gspread.utils import a1_range_to_grid_range, rowcol_to_a1
+from gspread.utils import (
+    ValueRenderOption, a1_range_to_grid_range,
+    rowcol_to_a1,
+)
 
-from enums import WriteOffType
-from filters import AlreadyExpiredFilter, BeforeExpiredFilter
 from models import (
-    EventPayload, NotificationEvent, ScheduledWriteOff, Worksheet,
+    EventPayload, NotificationEvent, ScheduledWriteOff,
     WriteOffWorksheetCoordinates,
 )
+from notification_rules import NotificationRulesTable
 
 __all__ = (
     'parse_checkbox_or_none',
     'parse_time_or_none',
+    'parse_unformatted_checkbox_or_none',
+    'parse_serial_time_or_none',
     'is_any_none',
     'none_if_empty',
     'serialize_upcoming_write_offs',
     'parse_worksheets_values',
+    'merge_checkbox_values',
+    'count_checkbox_rows',
+    'find_resized_worksheets',
 )
 
 logger = logging.getLogger('parser')
@@ -74,6 +80,53 @@ def parse_time_or_none(time: str, timezone: ZoneInfo) -> datetime.time | None:
         return
 
 
+def parse_unformatted_checkbox_or_none(value: bool | str) -> bool | None:
+    """
+    Unformatted checkboxes are represented as JSON booleans in Google Sheets.
+    """
+    if isinstance(value, bool):
+        return value
+
+
+def parse_serial_time_or_none(
+        serial_number: float | str,
+        timezone: ZoneInfo,
+) -> datetime.time | None:
+    """
+    Parse serial number time - fraction of the day, optionally with date
+    in the integer part.
+    """
+    if isinstance(serial_number, bool):
+        return
+    if not isinstance(serial_number, int | float):
+        return
+    if serial_number < 0:
+        return
+
+    seconds_of_day = round(serial_number % 1 * 86400)
+
+    # Fraction is rounded up to the next midnight
+    if seconds_of_day == 86400:
+        seconds_of_day = 0
+
+    hour, seconds_of_day = divmod(seconds_of_day, 3600)
+    minutes, seconds = divmod(seconds_of_day, 60)
+    return datetime.time(
+        hour=hour,
+        minute=minutes,
+        second=seconds,
+        tzinfo=timezone,
+    )
+
+
+def get_checkbox_parser(
+        value_render_option: ValueRenderOption,
+) -> Callable[[str | bool], bool | None]:
+    if value_render_option == ValueRenderOption.unformatted:
+        return parse_unformatted_checkbox_or_none
+    return parse_checkbox_or_none
+
+
 def is_any_none(*args) -> bool:
     return any(arg is None for arg in args)
 
@@ -84,9 +137,11 @@ class WorksheetRowsBuilder:
     write_off_time_column_number: int | None = None
     checkbox_column_number: int | None = None
 
-    ingredient_name_column: list[str] | None = None
-    to_write_off_at_column: list[str] | None = None
-    is_written_off_column: list[str] | None = None
+    received_ranges_count: int = 0
+
+    ingredient_name_column: list[str | float] | None = None
+    to_write_off_at_column: list[str | float] | None = None
+    is_written_off_column: list[str | bool] | None = None
 
     def get_worksheet_coordinates(
             self,
@@ -99,7 +154,13 @@ class WorksheetRowsBuilder:
             checkbox_column_number=self.checkbox_column_number,
         )
 
-    def build(self, timezone: ZoneInfo) -> list[ScheduledWriteOff]:
+    def build(
+            self,
+            timezone: ZoneInfo,
+            value_render_option: ValueRenderOption = (
+                    ValueRenderOption.formatted
+            ),
+    ) -> list[ScheduledWriteOff]:
         if is_any_none(
                 self.ingredient_name_column,
                 self.to_write_off_at_column,
@@ -113,14 +174,21 @@ class WorksheetRowsBuilder:
             self.is_written_off_column,
         )
 
+        if value_render_option == ValueRenderOption.unformatted:
+            parse_time = parse_serial_time_or_none
+        else:
+            parse_time = parse_time_or_none
+        parse_checkbox = get_checkbox_parser(value_render_option)
+
         write_offs: list[ScheduledWriteOff] = []
 
         for row_number, values in enumerate(zipped, start=2):
             ingredient_name, to_write_off_at, is_written_off = values
 
-            ingredient_name = none_if_empty(ingredient_name)
-            to_write_off_at = parse_time_or_none(to_write_off_at, timezone)
-            is_written_off = parse_checkbox_or_none(is_written_off)
+            # Unformatted names may come as numbers
+            ingredient_name = none_if_empty(str(ingredient_name))
+            to_write_off_at = parse_time(to_write_off_at, timezone)
+            is_written_off = parse_checkbox(is_written_off)
 
             if is_any_none(
                     ingredient_name,
@@ -144,7 +212,12 @@ class WorksheetRowsBuilder:
 def parse_worksheets_values(
         value_ranges: Iterable[Mapping],
         timezone: ZoneInfo,
-) -> itertools.chain[Worksheet]:
+        value_render_option: ValueRenderOption = ValueRenderOption.formatted,
+) -> Generator[ScheduledWriteOff, None, None]:
+    """
+    Write-offs of the worksheet are yielded as soon as
+    both of its value ranges are received.
+    """
     title_to_builders = collections.defaultdict(WorksheetRowsBuilder)
 
     for value_range in value_ranges:
@@ -156,6 +229,7 @@ def parse_worksheets_values(
         title = title.strip("'")
 
         builder = title_to_builders[title]
+        builder.received_ranges_count += 1
 
         is_ingredient_names_column = values_range.startswith('A')
 
@@ -175,36 +249,97 @@ def parse_worksheets_values(
             builder.write_off_time_column_number = write_off_time_column_number
             builder.checkbox_column_number = checkbox_column_number
 
-    nested_write_offs = (
-        builder.build(timezone)
-        for builder in title_to_builders.values()
-    )
-    return itertools.chain.from_iterable(nested_write_offs)
+        if builder.received_ranges_count == 2:
+            del title_to_builders[title]
+            yield from builder.build(timezone, value_render_option)
 
 
-def check_upcoming_write_off(
-        now: datetime.datetime,
-        expires_at: datetime.time,
-) -> WriteOffType | None:
-    filters = (
-        AlreadyExpiredFilter(interval_in_seconds=600),
-        BeforeExpiredFilter(
-            event_type=WriteOffType.EXPIRE_AT_15_MINUTES,
-            fire_before_in_seconds=900,
-        ),
-        BeforeExpiredFilter(
-            event_type=WriteOffType.EXPIRE_AT_10_MINUTES,
-            fire_before_in_seconds=600,
-        ),
-        BeforeExpiredFilter(
-            event_type=WriteOffType.EXPIRE_AT_5_MINUTES,
-            fire_before_in_seconds=300,
-        ),
-    )
+def count_checkbox_rows(
+        value_ranges: Iterable[Mapping],
+        title_to_rows_count: dict[str, int],
+) -> Generator[Mapping, None, None]:
+    """
+    Pass value ranges of the full read through, counting rows
+    of the "is written off" columns into `title_to_rows_count`,
+    so the streamed values are not kept.
+
+    Trailing empty cells are not returned,
+    so the count is the number of the last non-empty row.
+    """
+    for value_range in value_ranges:
+        title, values_range = value_range['range'].split('!')
+        if not values_range.startswith('A'):
+            columns = value_range.get('values', [])
+            title_to_rows_count[title.strip("'")] = (
+                len(columns[1]) if len(columns) == 2 else 0
+            )
+        yield value_range
+
+
+def find_resized_worksheets(
+        value_ranges: Iterable[Mapping],
+        title_to_rows_count: Mapping[str, int],
+) -> set[str]:
+    """
+    Titles of the worksheets whose fresh checkbox column has other number
+    of rows than on the full read. Rows are inserted or deleted there,
+    so the cached write-offs do not match their rows anymore.
+    """
+    resized_titles: set[str] = set()
+    for value_range in value_ranges:
+        title, _ = value_range['range'].split('!')
+        title = title.strip("'")
+        columns = value_range.get('values', [[]])
+        if len(columns[0]) != title_to_rows_count.get(title):
+            resized_titles.add(title)
+    return resized_titles
+
+
+def merge_checkbox_values(
+        write_offs: Iterable[ScheduledWriteOff],
+        value_ranges: Iterable[Mapping],
+        value_render_option: ValueRenderOption = ValueRenderOption.formatted,
+) -> list[ScheduledWriteOff]:
+    """
+    Update "is written off" state of already parsed write-offs
+    with fresh values of the checkbox columns.
+
+    Write-offs of the worksheets without fresh values are kept as is,
+    write-offs whose checkbox can not be parsed anymore are dropped.
+    """
+    parse_checkbox = get_checkbox_parser(value_render_option)
+
+    title_to_checkbox_column: dict[str, list[str | bool]] = {}
+    for value_range in value_ranges:
+        title, _ = value_range['range'].split('!')
+        columns = value_range.get('values', [[]])
+        title_to_checkbox_column[title.strip("'")] = columns[0]
+
+    merged_write_offs: list[ScheduledWriteOff] = []
+    for write_off in write_offs:
+        unit_name = write_off.worksheet_coordinates.unit_name
+        try:
+            checkbox_column = title_to_checkbox_column[unit_name]
+        except KeyError:
+            merged_write_offs.append(write_off)
+            continue
+
+        index = write_off.worksheet_coordinates.row_number - 2
+        if index < len(checkbox_column):
+            is_written_off = parse_checkbox(checkbox_column[index])
+        else:
+            is_written_off = None
+
+        if is_written_off is None:
+            continue
+
+        if is_written_off != write_off.is_written_off:
+            write_off = write_off.model_copy(
+                update={'is_written_off': is_written_off},
+            )
+        merged_write_offs.append(write_off)
 
-    for write_offs_filter in filters:
-        if write_offs_filter(now=now, expires_at=expires_at):
-            return write_offs_filter.event_type
+    return merged_write_offs
 
 
 class HasIsWrittenOff(Protocol):
@@ -224,11 +359,12 @@ def serialize_upcoming_write_offs(
         write_offs: Iterable[ScheduledWriteOff],
         now: datetime.datetime,
         unit_name_to_id: Mapping[str, int],
+        notification_rules: NotificationRulesTable,
 ) -> list[NotificationEvent]:
     events: list[NotificationEvent] = []
     for write_off in filter_written_off(write_offs):
 
-        event_type = check_upcoming_write_off(
+        event_type = notification_rules.get_event_type(
             now=now,
             expires_at=write_off.to_write_off_at,
         )
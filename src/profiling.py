@@ -0,0 +1,154 @@
+import contextlib
+import cProfile
+import datetime
+import io
+import pathlib
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections.abc import Generator
+from dataclasses import dataclass, field
+
+__all__ = ('TickProfiler', 'NullProfiler', 'StageProfile', 'Profiler')
+
+# Allocations made by the profiler itself are not interesting
+TRACEMALLOC_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, contextlib.__file__),
+)
+
+
+@dataclass(frozen=True, slots=True)
+class StageProfile:
+    name: str
+    duration_in_seconds: float
+    stats: pstats.Stats
+    allocations: list[tracemalloc.StatisticDiff]
+
+
+class NullProfiler:
+    """Profiler of the ticks that are not profiled."""
+
+    is_enabled: bool = False
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Generator[None, None, None]:
+        yield
+
+    def finish(self) -> None:
+        pass
+
+
+@dataclass(slots=True)
+class TickProfiler:
+    """
+    CPU profile and allocations of every stage of a single tick.
+
+    Every stage is saved to the `output_directory` as
+    `<timestamp>-<stage>.prof` (cProfile stats)
+    and `<timestamp>-<stage>.tracemalloc` (allocations snapshot) files.
+
+    Stages must not overlap, even in other threads: cProfile replaces
+    the profile of the outer stage on Python 3.11 and refuses to start
+    on 3.12+, so an overlapping stage raises `RuntimeError`.
+    """
+    output_directory: pathlib.Path
+    top_count: int = 10
+    is_enabled: bool = True
+    stage_profiles: list[StageProfile] = field(default_factory=list)
+    timestamp: str = field(
+        default_factory=lambda: datetime.datetime.now().strftime(
+            '%Y%m%d-%H%M%S',
+        ),
+    )
+    is_tracemalloc_started_here: bool = False
+    stage_lock: threading.Lock = field(default_factory=threading.Lock)
+    active_stage_name: str | None = None
+
+    def __post_init__(self) -> None:
+        self.output_directory.mkdir(parents=True, exist_ok=True)
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.is_tracemalloc_started_here = True
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Generator[None, None, None]:
+        if not self.stage_lock.acquire(blocking=False):
+            raise RuntimeError(
+                f'Stage {name} overlaps with stage {self.active_stage_name}'
+            )
+        self.active_stage_name = name
+        try:
+            with self.profile_stage(name):
+                yield
+        finally:
+            self.active_stage_name = None
+            self.stage_lock.release()
+
+    @contextlib.contextmanager
+    def profile_stage(self, name: str) -> Generator[None, None, None]:
+        profile = cProfile.Profile()
+        snapshot_before = tracemalloc.take_snapshot().filter_traces(
+            TRACEMALLOC_FILTERS,
+        )
+        started_at = time.perf_counter()
+
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            duration_in_seconds = time.perf_counter() - started_at
+            snapshot_after = tracemalloc.take_snapshot().filter_traces(
+                TRACEMALLOC_FILTERS,
+            )
+
+            file_path_prefix = (
+                    self.output_directory / f'{self.timestamp}-{name}'
+            )
+            profile.dump_stats(f'{file_path_prefix}.prof')
+            snapshot_after.dump(f'{file_path_prefix}.tracemalloc')
+
+            self.stage_profiles.append(
+                StageProfile(
+                    name=name,
+                    duration_in_seconds=duration_in_seconds,
+                    stats=pstats.Stats(profile),
+                    allocations=snapshot_after.compare_to(
+                        snapshot_before,
+                        'lineno',
+                    ),
+                )
+            )
+
+    def format_summary(self) -> str:
+        summary = io.StringIO()
+        summary.write(f'Tick profile {self.timestamp}\n')
+
+        for stage_profile in self.stage_profiles:
+            summary.write(
+                f'\n=== {stage_profile.name}:'
+                f' {stage_profile.duration_in_seconds:.3f}s\n'
+            )
+
+            stage_profile.stats.stream = summary
+            stage_profile.stats.sort_stats(pstats.SortKey.CUMULATIVE)
+            stage_profile.stats.print_stats(self.top_count)
+
+            summary.write('Top allocations:\n')
+            for allocation in stage_profile.allocations[:self.top_count]:
+                summary.write(f'{allocation}\n')
+
+        summary.write(f'\nProfiles are saved to {self.output_directory}\n')
+        return summary.getvalue()
+
+    def finish(self) -> None:
+        if self.is_tracemalloc_started_here:
+            tracemalloc.stop()
+        print(self.format_summary(), file=sys.stderr)
+
+
+Profiler = TickProfiler | NullProfiler
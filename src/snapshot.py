@@ -0,0 +1,233 @@
+import datetime
+import mmap
+import os
+import pathlib
+import struct
+import zlib
+from uuid import UUID
+from zoneinfo import ZoneInfo
+
+from models import (
+    Schedule, ScheduledWriteOff, Unit,
+    WriteOffWorksheetCoordinates,
+)
+
+__all__ = ('save_schedule_snapshot', 'load_schedule_snapshot')
+
+MAGIC = b'WOSS'
+VERSION = 2
+
+# magic, version, payload size, payload crc32
+HEADER = struct.Struct('<4sHII')
+COUNT = struct.Struct('<I')
+STRING_SIZE = struct.Struct('<I')
+REFRESHED_AT = struct.Struct('<d')
+# id, uuid
+UNIT = struct.Struct('<q16s')
+# worksheet title index, row number, write-off time column number,
+# checkbox column number, write-off time in seconds of day, is written off
+WRITE_OFF = struct.Struct('<IIHHI?')
+
+
+class SnapshotWriter:
+
+    def __init__(self):
+        self.__buffer = bytearray()
+
+    def write_struct(self, packer: struct.Struct, *values) -> None:
+        self.__buffer += packer.pack(*values)
+
+    def write_string(self, value: str) -> None:
+        encoded_value = value.encode('utf-8')
+        self.write_struct(STRING_SIZE, len(encoded_value))
+        self.__buffer += encoded_value
+
+    def get_bytes(self) -> bytes:
+        payload = bytes(self.__buffer)
+        header = HEADER.pack(MAGIC, VERSION, len(payload), zlib.crc32(payload))
+        return header + payload
+
+
+class SnapshotReader:
+
+    def __init__(self, buffer: mmap.mmap, offset: int):
+        self.__buffer = buffer
+        self.__offset = offset
+
+    def read_struct(self, unpacker: struct.Struct) -> tuple:
+        try:
+            values = unpacker.unpack_from(self.__buffer, self.__offset)
+        except struct.error as error:
+            raise ValueError('Snapshot is truncated') from error
+        self.__offset += unpacker.size
+        return values
+
+    def read_string(self) -> str:
+        size, = self.read_struct(STRING_SIZE)
+        end = self.__offset + size
+        if end > len(self.__buffer):
+            raise ValueError('Snapshot is truncated')
+        value = self.__buffer[self.__offset:end].decode('utf-8')
+        self.__offset = end
+        return value
+
+
+def save_schedule_snapshot(
+        schedule: Schedule,
+        file_path: pathlib.Path,
+        timezone: ZoneInfo,
+) -> None:
+    """Snapshot is replaced atomically, so it is never half-written."""
+    worksheet_titles = sorted(schedule.worksheet_titles)
+    title_to_index = {
+        title: index for index, title in enumerate(worksheet_titles)
+    }
+
+    writer = SnapshotWriter()
+    writer.write_string(timezone.key)
+    writer.write_struct(REFRESHED_AT, schedule.refreshed_at.timestamp())
+
+    writer.write_struct(COUNT, len(schedule.units))
+    for unit in schedule.units:
+        writer.write_struct(UNIT, unit.id, unit.uuid.bytes)
+        writer.write_string(unit.name)
+
+    writer.write_struct(COUNT, len(worksheet_titles))
+    for title in worksheet_titles:
+        writer.write_string(title)
+        writer.write_struct(
+            COUNT,
+            schedule.title_to_checkbox_rows_count.get(title, 0),
+        )
+
+    writer.write_struct(COUNT, len(schedule.write_offs))
+    for write_off in schedule.write_offs:
+        coordinates = write_off.worksheet_coordinates
+        to_write_off_at = write_off.to_write_off_at
+        writer.write_struct(
+            WRITE_OFF,
+            title_to_index[coordinates.unit_name],
+            coordinates.row_number,
+            coordinates.write_off_time_column_number,
+            coordinates.checkbox_column_number,
+            (
+                    to_write_off_at.hour * 3600
+                    + to_write_off_at.minute * 60
+                    + to_write_off_at.second
+            ),
+            write_off.is_written_off,
+        )
+        writer.write_string(write_off.ingredient_name)
+
+    temporary_file_path = file_path.with_name(f'{file_path.name}.tmp')
+    temporary_file_path.write_bytes(writer.get_bytes())
+    os.replace(temporary_file_path, file_path)
+
+
+def read_schedule(reader: SnapshotReader, timezone: ZoneInfo) -> Schedule:
+    timezone_key = reader.read_string()
+    if timezone_key != timezone.key:
+        raise ValueError(f'Snapshot is made in other timezone: {timezone_key}')
+
+    refreshed_at_timestamp, = reader.read_struct(REFRESHED_AT)
+    refreshed_at = datetime.datetime.fromtimestamp(
+        refreshed_at_timestamp,
+        tz=timezone,
+    )
+
+    units_count, = reader.read_struct(COUNT)
+    units: list[Unit] = []
+    for _ in range(units_count):
+        unit_id, unit_uuid = reader.read_struct(UNIT)
+        units.append(
+            Unit(
+                id=unit_id,
+                name=reader.read_string(),
+                uuid=UUID(bytes=unit_uuid),
+            )
+        )
+
+    worksheet_titles_count, = reader.read_struct(COUNT)
+    worksheet_titles: list[str] = []
+    title_to_checkbox_rows_count: dict[str, int] = {}
+    for _ in range(worksheet_titles_count):
+        title = reader.read_string()
+        title_to_checkbox_rows_count[title], = reader.read_struct(COUNT)
+        worksheet_titles.append(title)
+
+    write_offs_count, = reader.read_struct(COUNT)
+    write_offs: list[ScheduledWriteOff] = []
+    for _ in range(write_offs_count):
+        (
+            title_index,
+            row_number,
+            write_off_time_column_number,
+            checkbox_column_number,
+            seconds_of_day,
+            is_written_off,
+        ) = reader.read_struct(WRITE_OFF)
+        hour, seconds_of_day = divmod(seconds_of_day, 3600)
+        minute, second = divmod(seconds_of_day, 60)
+
+        try:
+            unit_name = worksheet_titles[title_index]
+            to_write_off_at = datetime.time(
+                hour=hour,
+                minute=minute,
+                second=second,
+                tzinfo=timezone,
+            )
+        except (IndexError, ValueError) as error:
+            raise ValueError('Snapshot write-off is corrupted') from error
+
+        write_offs.append(
+            ScheduledWriteOff(
+                ingredient_name=reader.read_string(),
+                to_write_off_at=to_write_off_at,
+                is_written_off=is_written_off,
+                worksheet_coordinates=WriteOffWorksheetCoordinates(
+                    unit_name=unit_name,
+                    row_number=row_number,
+                    write_off_time_column_number=write_off_time_column_number,
+                    checkbox_column_number=checkbox_column_number,
+                ),
+            )
+        )
+
+    return Schedule(
+        units=units,
+        worksheet_titles=set(worksheet_titles),
+        write_offs=write_offs,
+        refreshed_at=refreshed_at,
+        title_to_checkbox_rows_count=title_to_checkbox_rows_count,
+    )
+
+
+def load_schedule_snapshot(
+        file_path: pathlib.Path,
+        timezone: ZoneInfo,
+) -> Schedule:
+    """
+    Raises:
+        FileNotFoundError: Snapshot does not exist.
+        ValueError: Snapshot is corrupted, of other version or timezone.
+    """
+    with (
+        open(file_path, 'rb') as file,
+        mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer,
+    ):
+        reader = SnapshotReader(buffer, offset=0)
+        magic, version, payload_size, checksum = reader.read_struct(HEADER)
+
+        if magic != MAGIC:
+            raise ValueError('File is not a schedule snapshot')
+        if version != VERSION:
+            raise ValueError(f'Unsupported snapshot version: {version}')
+        if HEADER.size + payload_size != len(buffer):
+            raise ValueError('Snapshot size mismatch')
+
+        with memoryview(buffer) as view, view[HEADER.size:] as payload:
+            if zlib.crc32(payload) != checksum:
+                raise ValueError('Snapshot checksum mismatch')
+
+        return read_schedule(reader, timezone)
@@ -0,0 +1,68 @@
+import pathlib
+
+import pytest
+
+from config import ROOT_PATH, load_config
+from enums import WriteOffType
+
+CONFIG_WITHOUT_RULES = '''
+timezone = "Europe/Moscow"
+
+[google_sheets]
+credentials_file_path = "credentials.json"
+spreadsheet_key = "key"
+
+[units_storage]
+base_url = "http://localhost"
+
+[message_queue]
+url = "amqp://localhost"
+'''
+
+
+@pytest.fixture
+def config_file_path(tmp_path: pathlib.Path) -> pathlib.Path:
+    config_file_path = tmp_path / 'config.toml'
+    config_file_path.write_text(CONFIG_WITHOUT_RULES, encoding='utf-8')
+    return config_file_path
+
+
+def test_load_config_default_notification_rules(
+        config_file_path: pathlib.Path,
+):
+    config = load_config(config_file_path)
+
+    color = config.notification_rules.get_color(WriteOffType.ALREADY_EXPIRED)
+    assert (color.red, color.green, color.blue) == (1.0, 0.2, 0.0)
+    assert len(config.notification_rules.event_type_to_color) == 4
+
+
+def test_load_config_example_matches_defaults(
+        config_file_path: pathlib.Path,
+):
+    example_config_file_path = (
+            pathlib.Path(__file__).parent.parent / 'config.example.toml'
+    )
+    example_config = load_config(example_config_file_path)
+    config = load_config(config_file_path)
+
+    assert (
+            example_config.notification_rules
+            == config.notification_rules
+    )
+
+
+def test_load_config_outbox_file_path_relative_to_root(
+        config_file_path: pathlib.Path,
+):
+    config = load_config(config_file_path)
+
+    assert config.outbox_file_path == ROOT_PATH / 'outbox.sqlite3'
+
+
+def test_load_config_snapshot_file_path_relative_to_root(
+        config_file_path: pathlib.Path,
+):
+    config = load_config(config_file_path)
+
+    assert config.snapshot_file_path == ROOT_PATH / 'schedule.snapshot'
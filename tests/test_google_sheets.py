@@ -0,0 +1,210 @@
+import datetime
+import io
+import json
+from dataclasses import dataclass, field
+
+import pytest
+from gspread import Spreadsheet
+from gspread.http_client import HTTPClient
+from gspread.urls import SPREADSHEET_URL, SPREADSHEET_VALUES_BATCH_URL
+from requests import ConnectionError, Response
+
+from google_sheets import (
+    SpreadsheetContext, compute_checkbox_ranges, iter_value_ranges,
+    split_into_chunks,
+)
+
+
+@dataclass
+class FakeWorksheet:
+    title: str
+
+
+@dataclass
+class FakeSpreadsheet:
+    titles: list[str]
+    failing_titles: set[str] = field(default_factory=set)
+    requested_ranges: list[list[str]] = field(default_factory=list)
+
+    def worksheets(self, exclude_hidden: bool) -> list[FakeWorksheet]:
+        return [FakeWorksheet(title) for title in self.titles]
+
+    def values_batch_get(self, ranges: list[str], params: dict) -> dict:
+        self.requested_ranges.append(ranges)
+        titles = {values_range.split('!')[0] for values_range in ranges}
+        if titles & self.failing_titles:
+            self.failing_titles -= titles
+            raise ConnectionError
+        return {
+            'valueRanges': [
+                {'range': values_range} for values_range in ranges
+            ],
+        }
+
+
+@dataclass
+class FakeSession:
+    """Session of the real `HTTPClient` that serves JSON bodies by URL."""
+    url_to_body: dict[str, dict]
+    requests: list[dict] = field(default_factory=list)
+
+    def request(self, method: str, url: str, **kwargs) -> Response:
+        self.requests.append({'method': method, 'url': url, **kwargs})
+        response = Response()
+        response.status_code = 200
+        response.raw = io.BytesIO(
+            json.dumps(self.url_to_body[url]).encode('utf-8'),
+        )
+        return response
+
+
+@pytest.fixture
+def now() -> datetime.datetime:
+    # Saturday
+    return datetime.datetime(2024, 6, 15, 12)
+
+
+@pytest.mark.parametrize(
+    'items, chunk_size, expected',
+    [
+        ([1, 2, 3, 4, 5], 2, [[1, 2], [3, 4], [5]]),
+        ([1, 2], 5, [[1, 2]]),
+        ([], 3, []),
+    ],
+)
+def test_split_into_chunks(items, chunk_size, expected):
+    assert split_into_chunks(items, chunk_size) == expected
+
+
+def test_compute_checkbox_ranges(now: datetime.datetime):
+    assert compute_checkbox_ranges(
+        worksheet_titles=['A', 'B'],
+        now=now,
+    ) == ['A!M2:M', 'B!M2:M']
+
+
+def test_get_values_in_chunks(now: datetime.datetime):
+    spreadsheet = FakeSpreadsheet(
+        titles=['C', 'A', 'B', 'Hidden'],
+        failing_titles={'B'},
+    )
+    spreadsheet_context = SpreadsheetContext(
+        spreadsheet=spreadsheet,
+        titles_whitelist=['A', 'B', 'C'],
+    )
+
+    value_ranges, failed_titles = spreadsheet_context.get_values_in_chunks(
+        now,
+        chunk_size=2,
+        max_concurrency=2,
+        retry_delay_in_seconds=0,
+    )
+
+    assert [value_range['range'] for value_range in value_ranges] == [
+        'A!A2:A', 'A!L2:M',
+        'B!A2:A', 'B!L2:M',
+        'C!A2:A', 'C!L2:M',
+    ]
+    assert len(spreadsheet.requested_ranges) == 4
+    assert failed_titles == set()
+
+
+def test_get_values_in_chunks_skips_failed_chunks(now: datetime.datetime):
+    spreadsheet = FakeSpreadsheet(titles=['A', 'B'], failing_titles={'B'})
+    spreadsheet_context = SpreadsheetContext(
+        spreadsheet=spreadsheet,
+        titles_whitelist=['A', 'B'],
+    )
+
+    value_ranges, failed_titles = spreadsheet_context.get_values_in_chunks(
+        now,
+        chunk_size=1,
+        max_concurrency=2,
+        max_attempts=1,
+        retry_delay_in_seconds=0,
+    )
+
+    assert [value_range['range'] for value_range in value_ranges] == [
+        'A!A2:A', 'A!L2:M',
+    ]
+    assert failed_titles == {'B'}
+
+
+def test_spreadsheet_context_with_prefetched_worksheets():
+    spreadsheet = FakeSpreadsheet(titles=[])
+    spreadsheet_context = SpreadsheetContext(
+        spreadsheet=spreadsheet,
+        titles_whitelist=['A'],
+        worksheets=[FakeWorksheet('A'), FakeWorksheet('B')],
+    )
+
+    assert spreadsheet_context.get_titles() == {'A'}
+    assert spreadsheet_context.get_worksheet_by_title('B').title == 'B'
+
+
+def test_iter_values_through_real_spreadsheet(now: datetime.datetime):
+    value_ranges = [
+        {'range': "'Юнит 1'!A2:A3", 'values': [['Сыр', 'Ветчина']]},
+        {'range': "'Юнит 1'!L2:M3", 'values': [['10:30', '11:00']]},
+    ]
+    session = FakeSession(
+        url_to_body={
+            SPREADSHEET_URL % 'key': {
+                'properties': {'title': 'Write-offs'},
+            },
+            SPREADSHEET_VALUES_BATCH_URL % 'key': {
+                'spreadsheetId': 'key',
+                'valueRanges': value_ranges,
+            },
+        },
+    )
+    http_client = HTTPClient(auth=None, session=session)
+    http_client.timeout = 30
+    spreadsheet = Spreadsheet(http_client, {'id': 'key'})
+    spreadsheet_context = SpreadsheetContext(
+        spreadsheet=spreadsheet,
+        titles_whitelist=['Юнит 1'],
+        worksheets=[FakeWorksheet('Юнит 1')],
+    )
+
+    assert list(spreadsheet_context.iter_values(now, chunk_size=8)) == (
+        value_ranges
+    )
+    values_request = session.requests[-1]
+    assert values_request['stream'] is True
+    assert values_request['timeout'] == 30
+    assert values_request['params']['ranges'] == [
+        "Юнит 1!A2:A",
+        "Юнит 1!L2:M",
+    ]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 16, 1024])
+def test_iter_value_ranges(chunk_size):
+    value_ranges = [
+        {
+            'range': "'Юнит 1'!A2:A3",
+            'majorDimension': 'COLUMNS',
+            'values': [["Сыр", "Ветчина [1]"]],
+        },
+        {'range': "'Юнит 1'!B2:C3", 'majorDimension': 'COLUMNS'},
+    ]
+    body = json.dumps(
+        {'spreadsheetId': 'key', 'valueRanges': value_ranges},
+        ensure_ascii=False,
+        indent=2,
+    ).encode('utf-8')
+
+    chunks = split_into_chunks(body, chunk_size)
+
+    assert list(iter_value_ranges(chunks)) == value_ranges
+
+
+def test_iter_value_ranges_without_value_ranges():
+    assert list(iter_value_ranges([b'{"spreadsheetId": "key"}'])) == []
+
+
+def test_iter_value_ranges_truncated():
+    body = b'{"spreadsheetId": "key", "valueRanges": [{"range": "A'
+    with pytest.raises(ValueError):
+        list(iter_value_ranges(split_into_chunks(body, 4)))
@@ -0,0 +1,196 @@
+import datetime
+
+import pytest
+
+from enums import WriteOffType
+from filters import AlreadyExpiredFilter, BeforeExpiredFilter
+from notification_rules import (
+    NotificationRulesTable, compile_notification_rules,
+    parse_notification_rules,
+)
+
+RULES = [
+    {
+        'event_type': 'EXPIRE_AT_15_MINUTES',
+        'fire_before_in_seconds': 900,
+        'color': {'red': 1.0, 'green': 0.8, 'blue': 0.3},
+    },
+    {
+        'event_type': 'EXPIRE_AT_10_MINUTES',
+        'fire_before_in_seconds': 600,
+        'color': {'red': 0.9, 'green': 0.5, 'blue': 0.0},
+    },
+    {
+        'event_type': 'EXPIRE_AT_5_MINUTES',
+        'fire_before_in_seconds': 300,
+        'color': {'red': 0.9, 'green': 0.3, 'blue': 0.0},
+    },
+    {
+        'event_type': 'ALREADY_EXPIRED',
+        'interval_in_seconds': 600,
+        'color': {'red': 1.0, 'green': 0.2, 'blue': 0.0},
+    },
+]
+
+
+@pytest.fixture
+def now() -> datetime.datetime:
+    return datetime.datetime(2024, 6, 15, 12)
+
+
+@pytest.fixture
+def notification_rules() -> NotificationRulesTable:
+    return compile_notification_rules(parse_notification_rules(RULES))
+
+
+@pytest.mark.parametrize(
+    'time, expected',
+    [
+        (datetime.time(12, 15, 1), None),
+        (datetime.time(12, 15, 0), WriteOffType.EXPIRE_AT_15_MINUTES),
+        (datetime.time(12, 14, 0), WriteOffType.EXPIRE_AT_15_MINUTES),
+        (datetime.time(12, 13, 59), None),
+        (datetime.time(12, 10, 0), WriteOffType.EXPIRE_AT_10_MINUTES),
+        (datetime.time(12, 5, 0), WriteOffType.EXPIRE_AT_5_MINUTES),
+        (datetime.time(12, 1, 0), WriteOffType.ALREADY_EXPIRED),
+        (datetime.time(11, 50, 59), WriteOffType.ALREADY_EXPIRED),
+        (datetime.time(11, 49, 59), None),
+        (datetime.time(0, 0, 0), WriteOffType.ALREADY_EXPIRED),
+        (datetime.time(23, 59, 59), None),
+    ],
+)
+def test_notification_rules_table_get_event_type(
+        time: datetime.time,
+        expected: WriteOffType | None,
+        now: datetime.datetime,
+        notification_rules: NotificationRulesTable,
+):
+    assert notification_rules.get_event_type(now, time) == expected
+
+
+def test_notification_rules_table_matches_filters(
+        now: datetime.datetime,
+        notification_rules: NotificationRulesTable,
+):
+    filters = (
+        AlreadyExpiredFilter(interval_in_seconds=600),
+        BeforeExpiredFilter(
+            event_type=WriteOffType.EXPIRE_AT_15_MINUTES,
+            fire_before_in_seconds=900,
+        ),
+        BeforeExpiredFilter(
+            event_type=WriteOffType.EXPIRE_AT_10_MINUTES,
+            fire_before_in_seconds=600,
+        ),
+        BeforeExpiredFilter(
+            event_type=WriteOffType.EXPIRE_AT_5_MINUTES,
+            fire_before_in_seconds=300,
+        ),
+    )
+    for seconds in range(0, 86400, 7):
+        expires_at = datetime.time(
+            hour=seconds // 3600,
+            minute=seconds // 60 % 60,
+            second=seconds % 60,
+        )
+        expected = next(
+            (
+                write_offs_filter.event_type for write_offs_filter in filters
+                if write_offs_filter(now, expires_at)
+            ),
+            None,
+        )
+        assert notification_rules.get_event_type(now, expires_at) == expected
+
+
+def test_notification_rules_table_get_color(
+        notification_rules: NotificationRulesTable,
+):
+    color = notification_rules.get_color(WriteOffType.ALREADY_EXPIRED)
+    assert (color.red, color.green, color.blue) == (1.0, 0.2, 0.0)
+
+
+@pytest.mark.parametrize(
+    'rules',
+    [
+        [
+            {
+                'event_type': 'EXPIRE_AT_15_MINUTES',
+                'fire_before_in_seconds': 900,
+                'color': {'red': 1.0, 'green': 0.8, 'blue': 0.3},
+            },
+            {
+                'event_type': 'EXPIRE_AT_10_MINUTES',
+                'fire_before_in_seconds': 870,
+                'color': {'red': 0.9, 'green': 0.5, 'blue': 0.0},
+            },
+        ],
+        [
+            {
+                'event_type': 'EXPIRE_AT_5_MINUTES',
+                'fire_before_in_seconds': 30,
+                'color': {'red': 0.9, 'green': 0.3, 'blue': 0.0},
+            },
+            {
+                'event_type': 'ALREADY_EXPIRED',
+                'interval_in_seconds': 600,
+                'color': {'red': 1.0, 'green': 0.2, 'blue': 0.0},
+            },
+        ],
+        [
+            {
+                'event_type': 'EXPIRE_AT_5_MINUTES',
+                'fire_before_in_seconds': 300,
+                'color': {'red': 0.9, 'green': 0.3, 'blue': 0.0},
+            },
+            {
+                'event_type': 'EXPIRE_AT_5_MINUTES',
+                'fire_before_in_seconds': 600,
+                'color': {'red': 0.9, 'green': 0.3, 'blue': 0.0},
+            },
+        ],
+    ],
+)
+def test_compile_notification_rules_overlapping(rules):
+    with pytest.raises(ValueError):
+        compile_notification_rules(parse_notification_rules(rules))
+
+
+@pytest.mark.parametrize(
+    'rule',
+    [
+        {
+            'event_type': 'UNKNOWN',
+            'fire_before_in_seconds': 300,
+            'color': {'red': 0.9, 'green': 0.3, 'blue': 0.0},
+        },
+        {
+            'event_type': 'EXPIRE_AT_5_MINUTES',
+            'color': {'red': 0.9, 'green': 0.3, 'blue': 0.0},
+        },
+        {
+            'event_type': 'ALREADY_EXPIRED',
+            'fire_before_in_seconds': 300,
+            'interval_in_seconds': 600,
+            'color': {'red': 0.9, 'green': 0.3, 'blue': 0.0},
+        },
+        {
+            'event_type': 'EXPIRE_AT_5_MINUTES',
+            'fire_before_in_seconds': 0,
+            'color': {'red': 0.9, 'green': 0.3, 'blue': 0.0},
+        },
+        {
+            'event_type': 'ALREADY_EXPIRED',
+            'interval_in_seconds': 60,
+            'color': {'red': 0.9, 'green': 0.3, 'blue': 0.0},
+        },
+        {
+            'event_type': 'EXPIRE_AT_5_MINUTES',
+            'fire_before_in_seconds': 300,
+            'color': {'red': 1.5, 'green': 0.3, 'blue': 0.0},
+        },
+    ],
+)
+def test_parse_notification_rules_invalid(rule):
+    with pytest.raises(ValueError):
+        parse_notification_rules([rule])
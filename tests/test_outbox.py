@@ -0,0 +1,59 @@
+import pathlib
+
+import pytest
+
+from enums import WriteOffType
+from models import EventPayload, NotificationEvent
+from outbox import Outbox
+
+
+def create_event(ingredient_name: str) -> NotificationEvent:
+    return NotificationEvent(
+        unit_ids=[1],
+        payload=EventPayload(
+            type=WriteOffType.EXPIRE_AT_5_MINUTES,
+            unit_name='Unit 1',
+            ingredient_name=ingredient_name,
+            write_off_time_a1_coordinates='B2',
+            checkbox_a1_coordinates='C2',
+        ),
+    )
+
+
+@pytest.fixture
+def outbox_file_path(tmp_path: pathlib.Path) -> pathlib.Path:
+    return tmp_path / 'outbox.sqlite3'
+
+
+def test_outbox_pending_events_in_order(outbox_file_path: pathlib.Path):
+    outbox = Outbox(outbox_file_path)
+    events = [create_event('Cheese'), create_event('Ham')]
+
+    outbox.put_events(events)
+
+    pending_events = outbox.get_pending_events(limit=10)
+    assert [event for _, event in pending_events] == events
+    assert outbox.count_pending_events() == 2
+
+
+def test_outbox_acknowledge(outbox_file_path: pathlib.Path):
+    outbox = Outbox(outbox_file_path)
+    outbox.put_events([create_event('Cheese'), create_event('Ham')])
+
+    (event_id, _), = outbox.get_pending_events(limit=1)
+    outbox.acknowledge(event_id)
+
+    pending_events = outbox.get_pending_events(limit=10)
+    assert [event.payload.ingredient_name for _, event in pending_events] == [
+        'Ham',
+    ]
+
+
+def test_outbox_survives_restart(outbox_file_path: pathlib.Path):
+    outbox = Outbox(outbox_file_path)
+    outbox.put_events([create_event('Cheese')])
+    outbox.close()
+
+    outbox = Outbox(outbox_file_path)
+    pending_events = outbox.get_pending_events(limit=10)
+    assert [event for _, event in pending_events] == [create_event('Cheese')]
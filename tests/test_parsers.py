@@ -3,10 +3,14 @@ from zoneinfo import ZoneInfo
 
 import pytest
 
+from gspread.utils import ValueRenderOption
+
 from models import Row
 from parsers import (
-    is_any_none, none_if_empty, parse_checkbox_or_none,
-    parse_time_or_none,
+    count_checkbox_rows, find_resized_worksheets, is_any_none,
+    merge_checkbox_values, none_if_empty, parse_checkbox_or_none,
+    parse_serial_time_or_none, parse_time_or_none,
+    parse_unformatted_checkbox_or_none, parse_worksheets_values,
 )
 
 
@@ -87,3 +91,195 @@ def test_parse_time_or_none_invalid(invalid_time_str):
 )
 def test_is_any_none(args, expected_result):
     assert is_any_none(*args) == expected_result
+
+
+@pytest.mark.parametrize(
+    "input_value, expected_output",
+    [
+        (True, True),
+        (False, False),
+        ("TRUE", None),
+        ("", None),
+        (1, None),
+        (None, None),
+    ]
+)
+def test_parse_unformatted_checkbox_or_none(input_value, expected_output):
+    assert parse_unformatted_checkbox_or_none(input_value) == expected_output
+
+
+@pytest.mark.parametrize(
+    "serial_number, expected_time",
+    [
+        (0, time(0, 0, 0)),
+        (0.4375, time(10, 30, 0)),
+        (0.7815393518518519, time(18, 45, 25)),
+        (0.9993055555555556, time(23, 59, 0)),
+        (45458.4375, time(10, 30, 0)),
+        (0.99999999, time(0, 0, 0)),
+    ],
+)
+def test_parse_serial_time_or_none_valid(serial_number, expected_time):
+    timezone = ZoneInfo('UTC')
+    actual = parse_serial_time_or_none(serial_number, timezone)
+    expected = expected_time.replace(tzinfo=timezone)
+    assert actual == expected
+
+
+@pytest.mark.parametrize(
+    "invalid_serial_number",
+    [
+        "10:30:00",
+        "",
+        -0.5,
+        True,
+        None,
+    ]
+)
+def test_parse_serial_time_or_none_invalid(invalid_serial_number):
+    timezone = ZoneInfo('UTC')
+    assert parse_serial_time_or_none(invalid_serial_number, timezone) is None
+
+
+@pytest.mark.parametrize(
+    "value_render_option, values",
+    [
+        (
+            ValueRenderOption.formatted,
+            [["10:30", "", "18:45:25"], ["FALSE", "TRUE", "TRUE"]],
+        ),
+        (
+            ValueRenderOption.unformatted,
+            [[0.4375, "", 0.7815393518518519], [False, True, True]],
+        ),
+    ],
+)
+def test_parse_worksheets_values(value_render_option, values):
+    timezone = ZoneInfo('UTC')
+    value_ranges = [
+        {
+            'range': "'Unit 1'!A2:A4",
+            'values': [["Cheese", "Ham", "Tomato"]],
+        },
+        {
+            'range': "'Unit 1'!B2:C4",
+            'values': values,
+        },
+    ]
+
+    write_offs = list(
+        parse_worksheets_values(
+            value_ranges=value_ranges,
+            timezone=timezone,
+            value_render_option=value_render_option,
+        )
+    )
+
+    assert [
+        (
+            write_off.ingredient_name,
+            write_off.to_write_off_at,
+            write_off.is_written_off,
+            write_off.worksheet_coordinates.row_number,
+            write_off.worksheet_coordinates.write_off_time_column_number,
+            write_off.worksheet_coordinates.checkbox_column_number,
+        )
+        for write_off in write_offs
+    ] == [
+        ("Cheese", time(10, 30, tzinfo=timezone), False, 2, 2, 3),
+        ("Tomato", time(18, 45, 25, tzinfo=timezone), True, 4, 2, 3),
+    ]
+
+
+def test_parse_worksheets_values_yields_completed_worksheets():
+    timezone = ZoneInfo('UTC')
+
+    def value_ranges():
+        yield {'range': "'Unit 1'!A2:A2", 'values': [["Cheese"]]}
+        yield {'range': "'Unit 2'!A2:A2", 'values': [["Ham"]]}
+        yield {'range': "'Unit 1'!B2:C2", 'values': [["10:30"], ["FALSE"]]}
+        raise AssertionError('Worksheet must be yielded before')
+
+    write_offs = parse_worksheets_values(value_ranges(), timezone)
+
+    write_off = next(write_offs)
+    assert write_off.ingredient_name == "Cheese"
+    assert write_off.worksheet_coordinates.unit_name == "Unit 1"
+
+
+@pytest.mark.parametrize(
+    "value_render_option, checkbox_column",
+    [
+        (ValueRenderOption.formatted, ["TRUE", "", "FALSE"]),
+        (ValueRenderOption.unformatted, [True, "", False]),
+    ],
+)
+def test_merge_checkbox_values(value_render_option, checkbox_column):
+    timezone = ZoneInfo('UTC')
+    value_ranges = [
+        {
+            'range': "'Unit 1'!A2:A5",
+            'values': [["Cheese", "Ham", "Tomato", "Bacon"]],
+        },
+        {
+            'range': "'Unit 1'!B2:C5",
+            'values': [
+                ["10:30", "11:00", "12:00", "13:00"],
+                ["FALSE", "FALSE", "TRUE", "FALSE"],
+            ],
+        },
+        {'range': "'Unit 2'!A2:A2", 'values': [["Milk"]]},
+        {'range': "'Unit 2'!B2:C2", 'values': [["10:30"], ["FALSE"]]},
+    ]
+    write_offs = list(parse_worksheets_values(value_ranges, timezone))
+
+    merged_write_offs = merge_checkbox_values(
+        write_offs=write_offs,
+        value_ranges=[
+            {'range': "'Unit 1'!C2:C", 'values': [checkbox_column]},
+        ],
+        value_render_option=value_render_option,
+    )
+
+    assert [
+        (write_off.ingredient_name, write_off.is_written_off)
+        for write_off in merged_write_offs
+    ] == [
+        ("Cheese", True),
+        ("Tomato", False),
+        ("Milk", False),
+    ]
+
+
+def test_count_checkbox_rows():
+    value_ranges = [
+        {'range': "'Юнит 1'!A2:A4", 'values': [["Сыр", "Ветчина", "Лук"]]},
+        {
+            'range': "'Юнит 1'!L2:M4",
+            'values': [["10:30", "11:00", "12:00"], ["FALSE", "TRUE"]],
+        },
+        {'range': "'Юнит 2'!A2:A", 'values': [["Сыр"]]},
+        {'range': "'Юнит 2'!L2:M", 'values': [["10:30"]]},
+    ]
+    title_to_rows_count = {}
+
+    passed_value_ranges = list(
+        count_checkbox_rows(value_ranges, title_to_rows_count)
+    )
+
+    assert passed_value_ranges == value_ranges
+    assert title_to_rows_count == {'Юнит 1': 2, 'Юнит 2': 0}
+
+
+def test_find_resized_worksheets():
+    value_ranges = [
+        {'range': "'Юнит 1'!M2:M3", 'values': [["FALSE", "TRUE"]]},
+        {'range': "'Юнит 2'!M2:M4", 'values': [["FALSE", "TRUE", "TRUE"]]},
+        {'range': "'Юнит 3'!M2:M"},
+        {'range': "'Юнит 4'!M2:M"},
+    ]
+
+    assert find_resized_worksheets(
+        value_ranges=value_ranges,
+        title_to_rows_count={'Юнит 1': 2, 'Юнит 2': 2, 'Юнит 3': 0},
+    ) == {'Юнит 2', 'Юнит 4'}
@@ -0,0 +1,51 @@
+import pathlib
+
+import pytest
+
+from profiling import NullProfiler, TickProfiler
+
+
+def test_tick_profiler(tmp_path: pathlib.Path, capsys):
+    profiler = TickProfiler(output_directory=tmp_path / 'profiles')
+
+    with profiler.stage('parse'):
+        sorted(str(number) for number in range(1000))
+
+    profiler.finish()
+
+    file_names = {
+        file_path.name
+        for file_path in (tmp_path / 'profiles').iterdir()
+    }
+    assert file_names == {
+        f'{profiler.timestamp}-parse.prof',
+        f'{profiler.timestamp}-parse.tracemalloc',
+    }
+    assert '=== parse:' in capsys.readouterr().err
+
+
+def test_tick_profiler_refuses_overlapping_stages(tmp_path: pathlib.Path):
+    profiler = TickProfiler(output_directory=tmp_path / 'profiles')
+
+    with profiler.stage('drain'):
+        with pytest.raises(RuntimeError, match='overlaps with stage drain'):
+            with profiler.stage('parse'):
+                pass
+
+    with profiler.stage('parse'):
+        pass
+
+    profiler.finish()
+    assert [
+        stage_profile.name for stage_profile in profiler.stage_profiles
+    ] == ['drain', 'parse']
+
+
+def test_null_profiler():
+    profiler = NullProfiler()
+
+    with profiler.stage('parse'):
+        pass
+
+    profiler.finish()
+    assert not profiler.is_enabled
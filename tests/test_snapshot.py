@@ -0,0 +1,141 @@
+import datetime
+import pathlib
+from uuid import UUID
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from models import (
+    Schedule, ScheduledWriteOff, Unit,
+    WriteOffWorksheetCoordinates,
+)
+from snapshot import load_schedule_snapshot, save_schedule_snapshot
+
+
+@pytest.fixture
+def timezone() -> ZoneInfo:
+    return ZoneInfo('Europe/Moscow')
+
+
+@pytest.fixture
+def schedule(timezone: ZoneInfo) -> Schedule:
+    return Schedule(
+        units=[
+            Unit(
+                id=1,
+                name='Юнит 1',
+                uuid=UUID('6a1b4a9c-6b1a-4c8e-9f0e-2f1a3c4d5e6f'),
+            ),
+            Unit(
+                id=2,
+                name='Unit 2',
+                uuid=UUID('0b1c2d3e-4f50-6172-8394-a5b6c7d8e9f0'),
+            ),
+        ],
+        worksheet_titles={'Юнит 1', 'Unit 2'},
+        write_offs=[
+            ScheduledWriteOff(
+                ingredient_name='Сыр',
+                to_write_off_at=datetime.time(10, 30, 15, tzinfo=timezone),
+                is_written_off=False,
+                worksheet_coordinates=WriteOffWorksheetCoordinates(
+                    unit_name='Юнит 1',
+                    row_number=2,
+                    write_off_time_column_number=12,
+                    checkbox_column_number=13,
+                ),
+            ),
+            ScheduledWriteOff(
+                ingredient_name='Ham',
+                to_write_off_at=datetime.time(23, 59, tzinfo=timezone),
+                is_written_off=True,
+                worksheet_coordinates=WriteOffWorksheetCoordinates(
+                    unit_name='Unit 2',
+                    row_number=40,
+                    write_off_time_column_number=2,
+                    checkbox_column_number=3,
+                ),
+            ),
+        ],
+        refreshed_at=datetime.datetime(2024, 6, 15, 12, 30, tzinfo=timezone),
+        title_to_checkbox_rows_count={'Юнит 1': 1, 'Unit 2': 45},
+    )
+
+
+@pytest.fixture
+def snapshot_file_path(tmp_path: pathlib.Path) -> pathlib.Path:
+    return tmp_path / 'schedule.snapshot'
+
+
+def test_schedule_snapshot_round_trip(
+        schedule: Schedule,
+        snapshot_file_path: pathlib.Path,
+        timezone: ZoneInfo,
+):
+    save_schedule_snapshot(schedule, snapshot_file_path, timezone)
+
+    assert load_schedule_snapshot(snapshot_file_path, timezone) == schedule
+
+
+def test_schedule_snapshot_checksum_mismatch(
+        schedule: Schedule,
+        snapshot_file_path: pathlib.Path,
+        timezone: ZoneInfo,
+):
+    save_schedule_snapshot(schedule, snapshot_file_path, timezone)
+    data = bytearray(snapshot_file_path.read_bytes())
+    data[-1] ^= 0xFF
+    snapshot_file_path.write_bytes(data)
+
+    with pytest.raises(ValueError, match='checksum'):
+        load_schedule_snapshot(snapshot_file_path, timezone)
+
+
+def test_schedule_snapshot_truncated(
+        schedule: Schedule,
+        snapshot_file_path: pathlib.Path,
+        timezone: ZoneInfo,
+):
+    save_schedule_snapshot(schedule, snapshot_file_path, timezone)
+    data = snapshot_file_path.read_bytes()
+    snapshot_file_path.write_bytes(data[:-10])
+
+    with pytest.raises(ValueError):
+        load_schedule_snapshot(snapshot_file_path, timezone)
+
+
+def test_schedule_snapshot_unsupported_version(
+        schedule: Schedule,
+        snapshot_file_path: pathlib.Path,
+        timezone: ZoneInfo,
+):
+    save_schedule_snapshot(schedule, snapshot_file_path, timezone)
+    data = bytearray(snapshot_file_path.read_bytes())
+    data[4] += 1
+    snapshot_file_path.write_bytes(data)
+
+    with pytest.raises(ValueError, match='version'):
+        load_schedule_snapshot(snapshot_file_path, timezone)
+
+
+def test_schedule_snapshot_other_timezone(
+        schedule: Schedule,
+        snapshot_file_path: pathlib.Path,
+        timezone: ZoneInfo,
+):
+    save_schedule_snapshot(schedule, snapshot_file_path, timezone)
+
+    with pytest.raises(ValueError, match='timezone'):
+        load_schedule_snapshot(snapshot_file_path, ZoneInfo('UTC'))
+
+
+@pytest.mark.parametrize('data', [b'', b'not a snapshot at all'])
+def test_schedule_snapshot_invalid_file(
+        data: bytes,
+        snapshot_file_path: pathlib.Path,
+        timezone: ZoneInfo,
+):
+    snapshot_file_path.write_bytes(data)
+
+    with pytest.raises(ValueError):
+        load_schedule_snapshot(snapshot_file_path, timezone)